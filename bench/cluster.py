@@ -0,0 +1,164 @@
+# bench/cluster.py
+"""
+Run several local API nodes (separate uvicorn processes, stubbed WHOIS)
+and drive them round-robin with Zipf traffic, the way a plain load
+balancer would. With sharding on (the default) each node forwards
+requests for domains it doesn't own to the owner, so WHOIS lookups and
+verdict cache entries aren't duplicated across nodes.
+
+Reports per-node and total WHOIS lookups, verdict cache hit rate and
+forwarding counters, plus end-to-end latency.
+
+Usage:
+    python bench/cluster.py --nodes 3 --duration 20
+    python bench/cluster.py --nodes 3 --no-sharding        # baseline
+    python bench/cluster.py --nodes 3 --kill-after 10      # a node leaves mid-run
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+from load_test import PROJECT_ROOT, RESULTS_DIR, StubWhois, ZipfTraffic, send, summarize  # noqa: E402
+
+
+def serve(port: int, whois_latency_ms: float, whois_failure_rate: float):
+    """Node process: the API with WHOIS stubbed out."""
+    import uvicorn
+    import src.api as api
+    api.whois = StubWhois(whois_latency_ms, whois_failure_rate, seed=port)
+    uvicorn.run(api.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_nodes(n, base_port, sharding, args):
+    urls = [f"http://127.0.0.1:{base_port + i}" for i in range(n)]
+    procs = []
+    for i, url in enumerate(urls):
+        env = dict(os.environ)
+        if sharding:
+            env["SHARD_SELF"] = url
+            env["SHARD_PEERS"] = ",".join(u for u in urls if u != url)
+        cmd = [sys.executable, os.path.abspath(__file__), "--serve", str(base_port + i),
+               "--whois-latency-ms", str(args.whois_latency_ms),
+               "--whois-failure-rate", str(args.whois_failure_rate)]
+        procs.append(subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    give_up = time.monotonic() + 120
+    pending = set(urls)
+    while pending and time.monotonic() < give_up:
+        for url in list(pending):
+            try:
+                if requests.get(url + "/ready", timeout=1).status_code == 200:
+                    pending.discard(url)
+            except requests.RequestException:
+                pass
+        time.sleep(0.2)
+    if pending:
+        stop_nodes(procs)
+        raise RuntimeError(f"nodes not ready: {sorted(pending)}")
+    return urls, procs
+
+
+def stop_nodes(procs):
+    for p in procs:
+        if p.poll() is None:
+            p.terminate()
+    for p in procs:
+        p.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-node sharding benchmark.")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=8801)
+    parser.add_argument("--no-sharding", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=24)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--kill-after", type=float, help="terminate the last node after this many seconds")
+    parser.add_argument("--universe", type=int, default=10_000)
+    parser.add_argument("--zipf-s", type=float, default=1.0)
+    parser.add_argument("--known-fraction", type=float, default=0.7)
+    parser.add_argument("--whois-latency-ms", type=float, default=200)
+    parser.add_argument("--whois-failure-rate", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.whois_latency_ms, args.whois_failure_rate)
+        return
+
+    urls, procs = start_nodes(args.nodes, args.base_port, not args.no_sharding, args)
+    try:
+        traffic = ZipfTraffic(args.universe, args.known_fraction, args.zipf_s)
+        alive = list(urls)
+        results = []
+        lock = threading.Lock()
+        counter = iter(range(10 ** 12))
+        start = time.perf_counter()
+
+        def client():
+            local = []
+            while time.perf_counter() - start < args.duration:
+                with lock:
+                    base = alive[next(counter) % len(alive)]
+                local.append(send(base, traffic.next_url(), time.perf_counter(), args.timeout, {}))
+            with lock:
+                results.extend(local)
+
+        threads = [threading.Thread(target=client) for _ in range(args.concurrency)]
+        for t in threads:
+            t.start()
+        if args.kill_after:
+            time.sleep(args.kill_after)
+            with lock:
+                gone = alive.pop()
+            procs[urls.index(gone)].terminate()
+            print(f"Terminated {gone} at {args.kill_after:.0f}s")
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        nodes = {}
+        for url in alive:
+            m = requests.get(url + "/metrics", timeout=5).json()
+            nodes[url] = {
+                "whois_lookups": m["whois"]["misses"],
+                "whois_shared_in_flight": m["whois"]["single_flight"]["shared"],
+                "verdict_cache": m["verdict_cache"],
+                "sharding": m["sharding"],
+            }
+        hits = sum(n["verdict_cache"]["hits"] for n in nodes.values())
+        lookups = hits + sum(n["verdict_cache"]["misses"] for n in nodes.values())
+        report = {
+            "config": vars(args),
+            "results": summarize(results, elapsed),
+            "totals": {
+                "whois_lookups": sum(n["whois_lookups"] for n in nodes.values()),
+                "verdict_cache_hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            },
+            "nodes": nodes,
+        }
+    finally:
+        stop_nodes(procs)
+
+    mode = "unsharded" if args.no_sharding else "sharded"
+    out = args.out or os.path.join(RESULTS_DIR, f"cluster-{mode}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({"results": report["results"], "totals": report["totals"]}, indent=2))
+    print(f"Saved results to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+# bench/load_test.py
+"""
+End-to-end load test for the FastAPI app.
+
+Starts src.api under uvicorn in a separate process (so the load generator
+doesn't compete with it for the GIL) with WHOIS replaced by a stub
+(configurable latency and failure rate), then drives /check_url with
+Zipf-distributed traffic over a mix of known (Tranco) and unknown domains.
+
+Two modes:
+  --rate R          open loop: Poisson arrivals at R req/s; latency is
+                    measured from the scheduled send time, so a stalled
+                    server can't hide queueing delay
+  --concurrency C   closed loop: C clients sending back to back
+
+Usage:
+    python bench/load_test.py --rate 200 --duration 30
+    python bench/load_test.py --concurrency 32 --whois-latency-ms 300 --whois-failure-rate 0.1
+"""
+import argparse
+import bisect
+import json
+import os
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+import src.api as api  # noqa: E402
+
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "bench", "results")
+LEGIT_LOCAL = os.path.join(PROJECT_ROOT, "data", "raw", "legit_local.csv")
+UNKNOWN_TLDS = ["com", "net", "top", "xyz", "info", "online", "site"]
+PATHS = ["/", "/login", "/account/verify", "/index.html", "/search?q=shoes", "/signin?next=%2Fhome"]
+
+
+# ----------------------------
+# WHOIS stand-in
+# ----------------------------
+
+class StubWhois:
+    """Drop-in for the python-whois module: whois.whois(domain)."""
+
+    class Result:
+        def __init__(self, created):
+            self.creation_date = created
+
+    def __init__(self, latency_ms: float, failure_rate: float, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def whois(self, domain):
+        with self.lock:
+            self.calls += 1
+            # lognormal around the configured mean: WHOIS has a long tail
+            delay = self.rng.lognormvariate(0, 0.5) * self.latency_ms / 1000 / 1.13
+            fail = self.rng.random() < self.failure_rate
+            age_days = self.rng.randint(1, 8000)
+        time.sleep(delay)
+        if fail:
+            with self.lock:
+                self.failures += 1
+            raise ConnectionError("stub whois failure")
+        return self.Result(datetime.utcnow() - timedelta(days=age_days))
+
+
+# ----------------------------
+# Traffic
+# ----------------------------
+
+def known_domains():
+    top = api.load_top_domains()
+    if top:
+        return [d for d, _ in sorted(top.items(), key=lambda kv: kv[1])[:100_000]]
+    domains = []
+    if os.path.exists(LEGIT_LOCAL):
+        with open(LEGIT_LOCAL, encoding="utf-8") as f:
+            next(f, None)
+            for line in f:
+                host = line.strip().split("://")[-1].strip("/")
+                if host:
+                    domains.append(host)
+    return domains or ["google.com", "facebook.com", "github.com"]
+
+
+def random_domain(rng):
+    name = "".join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(6, 14)))
+    if rng.random() < 0.3:
+        name += "-" + rng.choice(["login", "secure", "verify", "account", "update"])
+    return f"{name}.{rng.choice(UNKNOWN_TLDS)}"
+
+
+class ZipfTraffic:
+    """
+    A universe of URLs whose popularity follows Zipf(s): the i-th most
+    popular URL is requested with probability proportional to 1 / i**s.
+    """
+
+    def __init__(self, universe: int, known_fraction: float, s: float, seed: int = 0):
+        rng = random.Random(seed)
+        known = known_domains()
+        self.urls = []
+        self.known = []
+        for _ in range(universe):
+            is_known = rng.random() < known_fraction
+            domain = rng.choice(known) if is_known else random_domain(rng)
+            sub = "www." if is_known and rng.random() < 0.5 else ""
+            self.urls.append(f"https://{sub}{domain}{rng.choice(PATHS)}")
+            self.known.append(is_known)
+        weights = [1.0 / (i ** s) for i in range(1, universe + 1)]
+        total = 0.0
+        self.cum = []
+        for w in weights:
+            total += w
+            self.cum.append(total)
+        self.rng = random.Random(seed + 1)
+        self.lock = threading.Lock()
+
+    def next_url(self):
+        with self.lock:
+            x = self.rng.random() * self.cum[-1]
+        return self.urls[bisect.bisect_left(self.cum, x)]
+
+
+# ----------------------------
+# Server
+# ----------------------------
+
+def serve(port: int, whois_latency_ms: float, whois_failure_rate: float, stats_path=None):
+    """Server process: the API with WHOIS stubbed out. Writes the stub's counts to stats_path on shutdown."""
+    import uvicorn
+    stub = StubWhois(whois_latency_ms, whois_failure_rate)
+    api.whois = stub
+
+    def write_stats():
+        with open(stats_path, "w") as f:
+            json.dump({"calls": stub.calls, "failures": stub.failures}, f)
+
+    if stats_path:
+        api.app.router.add_event_handler("shutdown", write_stats)
+    uvicorn.run(api.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server(port: int, args, stats_path, ready_timeout: float = 120):
+    """Start the server process and wait until /ready (warm-up done)."""
+    cmd = [sys.executable, os.path.abspath(__file__), "--serve", str(port),
+           "--whois-latency-ms", str(args.whois_latency_ms),
+           "--whois-failure-rate", str(args.whois_failure_rate),
+           "--whois-stats", stats_path]
+    proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    give_up = time.monotonic() + ready_timeout
+    try:
+        while time.monotonic() < give_up:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with status {proc.returncode}")
+            try:
+                r = requests.get(base + "/ready", timeout=1)
+                if r.status_code == 200:
+                    return proc, base
+                failed = {n: c.get("error") for n, c in r.json()["components"].items() if c["state"] == "failed"}
+                if failed:
+                    raise RuntimeError(f"server warm-up failed: {failed}")
+            except requests.RequestException:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError("server did not become ready")
+    except BaseException:
+        stop_server(proc)
+        raise
+
+
+def stop_server(proc):
+    if proc.poll() is None:
+        proc.terminate()
+    proc.wait(timeout=30)
+
+
+# ----------------------------
+# Load generation
+# ----------------------------
+
+_local = threading.local()
+
+
+def session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def send(base, url, scheduled, timeout, headers):
+    try:
+        r = session().post(base + "/check_url", json={"url": url}, timeout=timeout, headers=headers)
+        status = r.status_code
+        tier = r.json().get("service_tier") if status == 200 else None
+    except requests.RequestException as e:
+        status, tier = type(e).__name__, None
+    return time.perf_counter() - scheduled, status, tier
+
+
+def run_open_loop(base, traffic, rate, duration, timeout, headers, workers):
+    results = []
+    rng = random.Random(7)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        start = time.perf_counter()
+        next_at = start
+        while next_at - start < duration:
+            now = time.perf_counter()
+            if next_at > now:
+                time.sleep(next_at - now)
+            futures.append(pool.submit(send, base, traffic.next_url(), next_at, timeout, headers))
+            next_at += rng.expovariate(rate)
+        results = [f.result() for f in futures]
+    return results, time.perf_counter() - start
+
+
+def run_closed_loop(base, traffic, concurrency, duration, timeout, headers):
+    results = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def client():
+        local = []
+        while time.perf_counter() - start < duration:
+            local.append(send(base, traffic.next_url(), time.perf_counter(), timeout, headers))
+        with lock:
+            results.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - start
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return round(sorted_values[idx] * 1000, 2)
+
+
+def summarize(results, elapsed):
+    latencies = sorted(r[0] for r in results)
+    ok = [r for r in results if r[1] == 200]
+    statuses = Counter(str(r[1]) for r in results)
+    return {
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "p999": percentile(latencies, 0.999),
+            "max": percentile(latencies, 1.0),
+        },
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0,
+        "status_counts": dict(statuses),
+        "service_tiers": dict(Counter(r[2] for r in ok)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /check_url with Zipf traffic.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rate", type=float, help="open loop: arrivals per second")
+    mode.add_argument("--concurrency", type=int, help="closed loop: concurrent clients")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--universe", type=int, default=10_000, help="distinct URLs")
+    parser.add_argument("--zipf-s", type=float, default=1.0)
+    parser.add_argument("--known-fraction", type=float, default=0.7)
+    parser.add_argument("--whois-latency-ms", type=float, default=200)
+    parser.add_argument("--whois-failure-rate", type=float, default=0.05)
+    parser.add_argument("--deadline-ms", type=float, help="send X-Deadline-Ms with every request")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=256, help="open loop: max outstanding requests")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--out", help="JSON results path (default: bench/results/load_test-<ts>.json)")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--whois-stats", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.whois_latency_ms, args.whois_failure_rate, args.whois_stats)
+        return
+    if args.rate is None and args.concurrency is None:
+        args.concurrency = 16
+
+    stats_path = os.path.join(tempfile.mkdtemp(prefix="load_test-"), "whois.json")
+    server, base = start_server(args.port, args, stats_path)
+    traffic = ZipfTraffic(args.universe, args.known_fraction, args.zipf_s)
+    headers = {"X-Deadline-Ms": str(args.deadline_ms)} if args.deadline_ms else {}
+
+    print(f"Running {'open loop @ %.0f rps' % args.rate if args.rate else 'closed loop x%d' % args.concurrency}"
+          f" for {args.duration:.0f}s against {base} ...")
+    if args.rate:
+        results, elapsed = run_open_loop(base, traffic, args.rate, args.duration, args.timeout, headers, args.workers)
+    else:
+        results, elapsed = run_closed_loop(base, traffic, args.concurrency, args.duration, args.timeout, headers)
+
+    server_metrics = requests.get(base + "/metrics", timeout=5).json()
+    stop_server(server)
+    with open(stats_path) as f:
+        whois_stub = json.load(f)
+
+    report = {
+        "config": vars(args),
+        "results": summarize(results, elapsed),
+        "whois_stub": whois_stub,
+        "server_metrics": server_metrics,
+    }
+
+    out = args.out or os.path.join(RESULTS_DIR, f"load_test-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report["results"], indent=2))
+    print(f"Saved results to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# bench/lookalike.py
+"""
+Lookalike index benchmark: build time, memory and per-lookup latency of
+src/lookalike.py on synthetic domain lists (default 100k and 1M names),
+against a naive linear edit-distance scan on a handful of queries.
+
+Queries are typos / homoglyphs / tld swaps of listed domains plus
+unrelated domains (the common case in production: no match).
+
+Usage:
+    python bench/lookalike.py
+    python bench/lookalike.py --sizes 100000 --queries 5000
+    python bench/lookalike.py --tranco data/tranco_top1m.csv
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+from src.lookalike import (  # noqa: E402
+    LookalikeIndex, MAX_DISTANCE, MIN_NAME_LEN, osa_distance, read_tranco, skeleton, split_domain,
+)
+
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "bench", "results")
+SUFFIXES = ["com", "com", "com", "net", "org", "io", "de", "co.uk", "ru", "jp"]
+HOMOGLYPHS = {"a": "а", "o": "0", "l": "1", "e": "е", "i": "і", "p": "р", "c": "с"}
+
+
+def synthetic_domains(n, seed=0):
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ne", "tor", "pay", "bank", "shop", "net", "cloud",
+                 "ra", "zu", "vel", "dex", "fin", "go", "app", "mail", "hub", "soft"]
+    seen = set()
+    out = []
+    while len(out) < n:
+        name = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+        if rng.random() < 0.3:
+            name += str(rng.randint(0, 99))
+        domain = f"{name}.{rng.choice(SUFFIXES)}"
+        if domain not in seen:
+            seen.add(domain)
+            out.append((domain, len(out) + 1))
+    return out
+
+
+def typo(name, rng):
+    i = rng.randrange(len(name))
+    op = rng.choice(["sub", "ins", "del", "swap"])
+    if op == "sub":
+        return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+    if op == "ins":
+        return name[:i] + rng.choice(string.ascii_lowercase) + name[i:]
+    if op == "swap" and i < len(name) - 1:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + name[i + 1:]
+
+
+def homoglyph(name, rng):
+    spots = [i for i, c in enumerate(name) if c in HOMOGLYPHS]
+    if not spots:
+        return name
+    i = rng.choice(spots)
+    return name[:i] + HOMOGLYPHS[name[i]] + name[i + 1:]
+
+
+def make_queries(domains, n, seed=1):
+    rng = random.Random(seed)
+    queries = {"typo": [], "homoglyph": [], "tld_swap": [], "unknown": []}
+    per_kind = max(1, n // len(queries))
+    for kind in queries:
+        while len(queries[kind]) < per_kind:
+            name, suffix = split_domain(rng.choice(domains)[0])
+            if kind == "typo":
+                q = f"{typo(name, rng)}.{suffix}"
+            elif kind == "homoglyph":
+                q = f"{homoglyph(name, rng)}.{suffix}"
+            elif kind == "tld_swap":
+                q = f"{name}.{rng.choice(['xyz', 'top', 'shop'])}"
+            else:
+                q = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 14))) + ".xyz"
+            queries[kind].append(q)
+    return queries
+
+
+def latency(index, queries):
+    samples = []
+    hits = 0
+    for q in queries:
+        start = time.perf_counter()
+        match = index.lookup(q)
+        samples.append((time.perf_counter() - start) * 1e6)
+        hits += match is not None
+    a = np.array(samples)
+    return {
+        "queries": len(queries),
+        "hit_rate": round(hits / len(queries), 3),
+        "p50_us": round(float(np.percentile(a, 50)), 1),
+        "p99_us": round(float(np.percentile(a, 99)), 1),
+        "max_us": round(float(a.max()), 1),
+    }
+
+
+def naive_lookup(skeletons, domain):
+    """The linear scan the index replaces: OSA distance against every listed skeleton."""
+    sk = skeleton(split_domain(domain)[0])
+    best = None
+    for i, other in enumerate(skeletons):
+        d = osa_distance(sk, other)
+        if d <= MAX_DISTANCE and (best is None or d < best[0]):
+            best = (d, i)
+    return best
+
+
+def bench_size(domains, n_queries, naive_queries):
+    start = time.perf_counter()
+    index = LookalikeIndex(domains, max_rank=None)
+    build_s = time.perf_counter() - start
+
+    queries = make_queries(domains, n_queries)
+    for q in queries["typo"][:100]:  # warm
+        index.lookup(q)
+    result = {
+        "domains": len(domains),
+        "build_seconds": round(build_s, 2),
+        **index.stats(),
+        "latency": {kind: latency(index, qs) for kind, qs in queries.items()},
+    }
+
+    if naive_queries:
+        skeletons = [s for s in index.skeletons if len(s) >= MIN_NAME_LEN]
+        sample = [q for qs in queries.values() for q in qs[:max(1, naive_queries // len(queries))]]
+        start = time.perf_counter()
+        for q in sample:
+            naive_lookup(skeletons, q)
+        naive_us = (time.perf_counter() - start) / len(sample) * 1e6
+        result["naive_scan"] = {"queries": len(sample), "mean_us": round(naive_us, 1)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lookalike index benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--naive-queries", type=int, default=8,
+                        help="queries timed against a linear scan (0 to skip; it is slow)")
+    parser.add_argument("--tranco", help="benchmark on a real Tranco CSV instead of synthetic lists")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    if args.tranco:
+        full = list(read_tranco(args.tranco))
+        datasets = [full[:n] for n in args.sizes]
+    else:
+        datasets = [synthetic_domains(n) for n in args.sizes]
+
+    report = {"config": vars(args), "results": []}
+    for domains in datasets:
+        print(f"\n{len(domains):,} domains:")
+        r = bench_size(domains, args.queries, args.naive_queries)
+        report["results"].append(r)
+        print(f"  build {r['build_seconds']}s, {r['index_entries']:,} entries, "
+              f"{r['memory_bytes'] / 1e6:.1f} MB")
+        print(f"  {'queries':<10} {'hit rate':>8} {'p50 us':>8} {'p99 us':>8} {'max us':>8}")
+        for kind, lat in r["latency"].items():
+            print(f"  {kind:<10} {lat['hit_rate']:>8} {lat['p50_us']:>8} {lat['p99_us']:>8} {lat['max_us']:>8}")
+        if "naive_scan" in r:
+            print(f"  naive linear scan: {r['naive_scan']['mean_us'] / 1000:.1f} ms/query")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"lookalike-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {out}")
+
+
+if __name__ == "__main__":
+    main()
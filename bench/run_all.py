@@ -0,0 +1,45 @@
+# bench/run_all.py
+"""
+Benchmark workflow: runs every benchmark below with its default settings
+and leaves one JSON result per benchmark in bench/results/.
+
+Usage:
+    python bench/run_all.py            # all benchmarks
+    python bench/run_all.py load_test  # just one
+"""
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# name -> extra arguments
+BENCHMARKS = {
+    "load_test": ["--concurrency", "16", "--duration", "20"],
+    "cluster": ["--nodes", "3", "--duration", "20"],
+    "serialization": [],
+    "lookalike": [],
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    failed = []
+    for name in names:
+        out = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+        cmd = [sys.executable, os.path.join(BENCH_DIR, f"{name}.py"), *BENCHMARKS[name], "--out", out]
+        print(f"\n=== {name} ===")
+        if subprocess.run(cmd, cwd=PROJECT_ROOT).returncode != 0:
+            failed.append(name)
+    if failed:
+        print("\nFailed:", ", ".join(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# bench/serialization.py
+"""
+Serialization cost and payload size of /check_url verdicts: the JSON path
+(pydantic request validation, FastAPI's jsonable_encoder + JSONResponse;
+json.dumps for batches) against MessagePack and the fixed-layout struct
+format in src/wire_format.py.
+
+Usage:
+    python bench/serialization.py
+    python bench/serialization.py --batch 100 --iterations 20000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+from src import wire_format as wf  # noqa: E402
+from src.api import URLRequest  # noqa: E402
+
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "bench", "results")
+
+
+def sample_verdicts(n, seed=0):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        domain = rng.choice(["google.com", "github.com", "secure-login-verify.xyz", "pages.dev", "example.org"])
+        out.append({
+            "url": f"https://{domain}/path/{i}?q={rng.randint(0, 10**6)}",
+            "is_phishing": rng.random() < 0.3,
+            "probability": rng.random(),
+            "confidence": rng.choice(wf.CONFIDENCES),
+            "domain": domain,
+            "tranco_rank": rng.choice([None, rng.randint(1, 1_000_000)]),
+            "domain_age_days": rng.choice([None, rng.randint(1, 9000)]),
+            "decision_reason": rng.choice(wf.DECISION_REASONS),
+            "cache_ttl": rng.choice([600, 3600, 86400]),
+            "cache_scope": rng.choice(["url", "domain"]),
+            "service_tier": "full",
+            "cached": False,
+        })
+    return out
+
+
+def per_op_us(fn, iterations):
+    fn()  # warm
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - start) / iterations * 1e6, 3)
+
+
+def fastapi_json(payload):
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def bench_case(verdicts, batch, iterations):
+    urls = [v["url"] for v in verdicts]
+    single = verdicts[0]
+    payload = {"results": verdicts} if batch else single
+    items = verdicts if batch else [single]
+
+    json_req = json.dumps({"urls": urls} if batch else {"url": urls[0]}).encode()
+    # what the server does: /check_url returns a dict through FastAPI, the batch endpoint encodes itself
+    encode_json = (lambda: wf.encode(items, wf.JSON, batch=True)) if batch else (lambda: fastapi_json(payload))
+    json_resp = encode_json()
+    formats = {
+        "json": {
+            "request_decode_us": per_op_us(
+                (lambda: wf.decode_urls(json_req, wf.JSON, batch=True)) if batch
+                else (lambda: URLRequest.model_validate_json(json_req)), iterations),
+            "response_encode_us": per_op_us(encode_json, iterations),
+            "client_decode_us": per_op_us(lambda: json.loads(json_resp), iterations),
+            "request_bytes": len(json_req),
+            "response_bytes": len(json_resp),
+        },
+    }
+    struct_req = wf.pack_struct_request(urls if batch else urls[:1])
+    struct_resp = wf.encode(items, wf.STRUCT, batch)
+    formats["struct"] = {
+        "request_decode_us": per_op_us(lambda: wf.decode_urls(struct_req, wf.STRUCT, batch), iterations),
+        "response_encode_us": per_op_us(lambda: wf.encode(items, wf.STRUCT, batch), iterations),
+        "client_decode_us": per_op_us(lambda: wf.unpack_struct_response(struct_resp), iterations),
+        "request_bytes": len(struct_req),
+        "response_bytes": len(struct_resp),
+    }
+    if wf.HAS_MSGPACK:
+        import msgpack
+        mp_req = msgpack.packb({"urls": urls} if batch else {"url": urls[0]})
+        mp_resp = wf.encode(items, wf.MSGPACK, batch)
+        formats["msgpack"] = {
+            "request_decode_us": per_op_us(lambda: wf.decode_urls(mp_req, wf.MSGPACK, batch), iterations),
+            "response_encode_us": per_op_us(lambda: wf.encode(items, wf.MSGPACK, batch), iterations),
+            "client_decode_us": per_op_us(lambda: msgpack.unpackb(mp_resp, raw=False), iterations),
+            "request_bytes": len(mp_req),
+            "response_bytes": len(mp_resp),
+        }
+    return formats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wire format serialization benchmark.")
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    verdicts = sample_verdicts(args.batch)
+    report = {
+        "config": vars(args),
+        "msgpack_available": wf.HAS_MSGPACK,
+        "single": bench_case(verdicts, batch=False, iterations=args.iterations),
+        f"batch_{args.batch}": bench_case(verdicts, batch=True, iterations=max(1, args.iterations // args.batch)),
+    }
+
+    for case, formats in report.items():
+        if not isinstance(formats, dict) or "json" not in formats:
+            continue
+        print(f"\n{case}:")
+        print(f"  {'format':<8} {'req decode us':>14} {'resp encode us':>15} {'client decode us':>17} {'req B':>7} {'resp B':>7}")
+        for name, r in formats.items():
+            print(f"  {name:<8} {r['request_decode_us']:>14} {r['response_encode_us']:>15} "
+                  f"{r['client_decode_us']:>17} {r['request_bytes']:>7} {r['response_bytes']:>7}")
+    if not wf.HAS_MSGPACK:
+        print("\n(msgpack not installed; MessagePack rows skipped)")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"serialization-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+// extension/scripts/background.js
+//
+// Keeps the hash-prefix lists in sync and answers local lookups for the
+// content script and popup, so most pages never need a backend call.
+// Also the single writer of the verdict cache (see verdict_cache.js).
+
+importScripts("verdict_cache.js", "hash_prefix.js");
+
+const API_BASE = "http://127.0.0.1:8000"; // FastAPI backend
+const SYNC_ALARM = "prefixSync";
+const SYNC_PERIOD_MINUTES = 30;
+
+function syncPrefixes() {
+  HashPrefix.sync(API_BASE).catch((e) => console.warn("Background → prefix sync failed", e));
+}
+
+chrome.runtime.onInstalled.addListener(() => {
+  chrome.alarms.create(SYNC_ALARM, { periodInMinutes: SYNC_PERIOD_MINUTES });
+  syncPrefixes();
+});
+
+chrome.runtime.onStartup.addListener(syncPrefixes);
+
+chrome.alarms.onAlarm.addListener((alarm) => {
+  if (alarm.name === SYNC_ALARM) syncPrefixes();
+});
+
+chrome.runtime.onMessage.addListener((msg, sender, sendResponse) => {
+  if (!msg) return false;
+
+  if (msg.type === "resolveUrl") {
+    HashPrefix.resolve(msg.url)
+      .then(sendResponse)
+      .catch(() => sendResponse({ status: "unknown" }));
+    return true; // async response
+  }
+
+  if (msg.type === "verdictCachePut") {
+    VerdictCache.put(msg.url, msg.data).then(() => sendResponse({ ok: true }));
+    return true;
+  }
+
+  if (msg.type === "prefixStats") {
+    HashPrefix.stats().then(sendResponse);
+    return true;
+  }
+
+  return false;
+});
@@ -2,7 +2,31 @@
 
 const API_URL = "http://127.0.0.1:8000/check_url"; // FastAPI backend
 
+async function resolveLocally(url) {
+  try {
+    const res = await chrome.runtime.sendMessage({ type: "resolveUrl", url });
+    return res || { status: "unknown" };
+  } catch (e) {
+    console.warn("Content Script → local lookup unavailable", e);
+    return { status: "unknown" };
+  }
+}
+
 async function checkUrl(url) {
+  // Hash-prefix lists first: known-good domains are answered locally,
+  // and a bad-prefix hit always goes to the backend (never the cache).
+  const local = await resolveLocally(url);
+  if (local.status === "safe") {
+    console.log("Content Script → resolved locally:", local.result);
+    return { isPhishing: false, raw: local.result };
+  }
+
+  const cached = local.status === "prefix_hit" ? null : await VerdictCache.get(url);
+  if (cached) {
+    console.log("Content Script → cached result:", cached);
+    return { isPhishing: !!cached.is_phishing, raw: cached };
+  }
+
   try {
     const res = await fetch(API_URL, {
       method: "POST",
@@ -16,6 +40,7 @@ async function checkUrl(url) {
     }
 
     const data = await res.json();
+    await VerdictCache.put(url, data);
     console.log("Content Script → backend result:", data);
 
     // Normalize to a single boolean
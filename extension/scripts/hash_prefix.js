@@ -0,0 +1,220 @@
+// extension/scripts/hash_prefix.js
+//
+// Local hash-prefix lookups (loaded by the background service worker).
+// Mirrors src/hash_prefix.py:
+//   "bad"  list: 4-byte SHA-256 prefixes of normalized phishing URLs / "host/"
+//   "good" list: 8-byte SHA-256 prefixes of high-reputation registered domains
+// A bad-prefix hit means "ask the backend"; a good hit is answered locally.
+
+const HashPrefix = (() => {
+  const LIST_NAMES = ["bad", "good"];
+  const STORAGE_KEY = "prefixLists";
+  const STATS_KEY = "prefixStats";
+
+  let lists = null; // { bad: { version, prefixLen, data: Uint8Array }, good: ... }
+
+  function b64ToBytes(b64) {
+    const bin = atob(b64 || "");
+    const out = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) out[i] = bin.charCodeAt(i);
+    return out;
+  }
+
+  function bytesToB64(bytes) {
+    let bin = "";
+    for (let i = 0; i < bytes.length; i += 0x8000) {
+      bin += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    }
+    return btoa(bin);
+  }
+
+  function toHex(bytes) {
+    return Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+  }
+
+  async function sha256(text) {
+    const buf = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(text));
+    return new Uint8Array(buf);
+  }
+
+  // Same canonical form as normalize_url() in src/blocklist.py (the URL
+  // parser's: punycode host, percent-encoded path/query, dots resolved).
+  // Check with: python src/blocklist.py --parity
+  function normalizeUrl(url) {
+    const parsed = new URL(url);
+    let host = parsed.hostname.replace(/\.$/, "");
+    if (parsed.port && parsed.port !== "80" && parsed.port !== "443") {
+      host += ":" + parsed.port;
+    }
+    return host + (parsed.pathname || "/") + parsed.search;
+  }
+
+  function compare(data, offset, prefix) {
+    for (let i = 0; i < prefix.length; i++) {
+      const d = data[offset + i] - prefix[i];
+      if (d !== 0) return d;
+    }
+    return 0;
+  }
+
+  // Binary search over the sorted, fixed-width prefixes.
+  function contains(list, hash) {
+    if (!list || !list.data.length) return false;
+    const n = list.prefixLen;
+    const prefix = hash.subarray(0, n);
+    let lo = 0;
+    let hi = list.data.length / n - 1;
+    while (lo <= hi) {
+      const mid = (lo + hi) >> 1;
+      const c = compare(list.data, mid * n, prefix);
+      if (c === 0) return true;
+      if (c < 0) lo = mid + 1;
+      else hi = mid - 1;
+    }
+    return false;
+  }
+
+  function split(bytes, n) {
+    const out = [];
+    for (let i = 0; i < bytes.length; i += n) out.push(toHex(bytes.subarray(i, i + n)));
+    return out;
+  }
+
+  function join(hexPrefixes) {
+    hexPrefixes.sort();
+    const out = new Uint8Array(hexPrefixes.reduce((s, h) => s + h.length / 2, 0));
+    let pos = 0;
+    for (const h of hexPrefixes) {
+      for (let i = 0; i < h.length; i += 2) out[pos++] = parseInt(h.slice(i, i + 2), 16);
+    }
+    return out;
+  }
+
+  async function load() {
+    if (lists) return lists;
+    const stored = (await chrome.storage.local.get(STORAGE_KEY))[STORAGE_KEY] || {};
+    lists = {};
+    for (const name of LIST_NAMES) {
+      const s = stored[name];
+      lists[name] = s
+        ? { version: s.version, prefixLen: s.prefixLen, data: b64ToBytes(s.data) }
+        : { version: 0, prefixLen: name === "good" ? 8 : 4, data: new Uint8Array(0) };
+    }
+    return lists;
+  }
+
+  async function save() {
+    const out = {};
+    for (const name of LIST_NAMES) {
+      const l = lists[name];
+      out[name] = { version: l.version, prefixLen: l.prefixLen, data: bytesToB64(l.data) };
+    }
+    await chrome.storage.local.set({ [STORAGE_KEY]: out });
+  }
+
+  async function bumpStats(fields) {
+    const stats = (await chrome.storage.local.get(STATS_KEY))[STATS_KEY] || {
+      resolvedSafe: 0, prefixHits: 0, unknown: 0, syncs: 0, syncBytes: 0,
+    };
+    for (const [k, v] of Object.entries(fields)) stats[k] = (stats[k] || 0) + v;
+    await chrome.storage.local.set({ [STATS_KEY]: stats });
+  }
+
+  function apply(list, payload) {
+    const additions = b64ToBytes(payload.additions);
+    if (payload.full) {
+      return { version: payload.version, prefixLen: payload.prefix_len, data: additions };
+    }
+    if (!additions.length && !payload.removals) {
+      return { ...list, version: payload.version };
+    }
+    const n = payload.prefix_len;
+    const current = new Set(split(list.data, n));
+    for (const h of split(b64ToBytes(payload.removals), n)) current.delete(h);
+    for (const h of split(additions, n)) current.add(h);
+    return { version: payload.version, prefixLen: n, data: join([...current]) };
+  }
+
+  // Fetch full lists or deltas from the backend and verify their checksums.
+  async function sync(apiBase) {
+    await load();
+    let bytes = 0;
+    for (const name of LIST_NAMES) {
+      try {
+        for (let attempt = 0; attempt < 2; attempt++) {
+          const version = attempt === 0 ? lists[name].version : 0;
+          const res = await fetch(`${apiBase}/prefixes/${name}?version=${version}`);
+          if (!res.ok) break;
+          const text = await res.text();
+          bytes += text.length;
+
+          const payload = JSON.parse(text);
+          const updated = apply(lists[name], payload);
+          if (toHex(await sha256Bytes(updated.data)) === payload.checksum) {
+            lists[name] = updated;
+            break;
+          }
+          console.warn(`HashPrefix → checksum mismatch for ${name}, fetching full list`);
+        }
+      } catch (e) {
+        console.warn(`HashPrefix → sync of ${name} failed`, e);
+      }
+    }
+    await save();
+    await bumpStats({ syncs: 1, syncBytes: bytes });
+  }
+
+  async function sha256Bytes(bytes) {
+    return new Uint8Array(await crypto.subtle.digest("SHA-256", bytes));
+  }
+
+  // Returns { status: "safe" | "prefix_hit" | "unknown", result? }.
+  async function resolve(url) {
+    await load();
+    const parsed = new URL(url);
+    const domain = VerdictCache.registeredDomain(parsed.hostname);
+    const host = parsed.hostname.replace(/\.$/, "");
+
+    // Host blocks apply on every port (the server matches the hostname),
+    // so the host expression carries no port.
+    const badExprs = [normalizeUrl(url), host + "/"];
+    for (const expr of badExprs) {
+      if (contains(lists.bad, await sha256(expr))) {
+        await bumpStats({ prefixHits: 1 });
+        return { status: "prefix_hit" };
+      }
+    }
+
+    if (contains(lists.good, await sha256(domain))) {
+      await bumpStats({ resolvedSafe: 1 });
+      return {
+        status: "safe",
+        result: {
+          url,
+          is_phishing: false,
+          probability: 0,
+          confidence: "high",
+          domain,
+          decision_reason: "local_allowlist",
+        },
+      };
+    }
+
+    await bumpStats({ unknown: 1 });
+    return { status: "unknown" };
+  }
+
+  async function stats() {
+    await load();
+    const s = (await chrome.storage.local.get(STATS_KEY))[STATS_KEY] || {};
+    const lookups = (s.resolvedSafe || 0) + (s.prefixHits || 0) + (s.unknown || 0);
+    return {
+      ...s,
+      localFraction: lookups ? (s.resolvedSafe || 0) / lookups : 0,
+      bundleBytes: LIST_NAMES.reduce((sum, n) => sum + lists[n].data.length, 0),
+      versions: Object.fromEntries(LIST_NAMES.map((n) => [n, lists[n].version])),
+    };
+  }
+
+  return { sync, resolve, stats, normalizeUrl };
+})();
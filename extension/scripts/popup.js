@@ -1,7 +1,31 @@
 const API_URL = "http://127.0.0.1:8000/check_url";
 document.addEventListener("DOMContentLoaded", () => {
 
+  async function resolveLocally(url) {
+    try {
+      const res = await chrome.runtime.sendMessage({ type: "resolveUrl", url });
+      return res || { status: "unknown" };
+    } catch (e) {
+      console.warn("Popup → local lookup unavailable", e);
+      return { status: "unknown" };
+    }
+  }
+
   async function checkUrl(url) {
+    // Hash-prefix lists first: known-good domains are answered locally,
+    // and a bad-prefix hit always goes to the backend (never the cache).
+    const local = await resolveLocally(url);
+    if (local.status === "safe") {
+      console.log("Popup → resolved locally:", local.result);
+      return { isPhishing: false, raw: local.result };
+    }
+
+    const cached = local.status === "prefix_hit" ? null : await VerdictCache.get(url);
+    if (cached) {
+      console.log("Popup → cached result:", cached);
+      return { isPhishing: !!cached.is_phishing, raw: cached };
+    }
+
     try {
       const res = await fetch(API_URL, {
         method: "POST",
@@ -15,6 +39,7 @@ document.addEventListener("DOMContentLoaded", () => {
       }
 
       const data = await res.json();
+      await VerdictCache.put(url, data);
       console.log("Popup → backend result:", data);
 
       const isPhishing = !!(
@@ -0,0 +1,112 @@
+// extension/scripts/verdict_cache.js
+//
+// Bounded verdict cache shared by the content script and the popup
+// (stored in chrome.storage.local). The backend tells us how long a
+// verdict is valid (cache_ttl, seconds) and whether it holds for the exact
+// URL or for the whole registered domain (cache_scope).
+//
+// Lookups only read storage. Writes all go through the background service
+// worker, one at a time, so concurrent tabs and the popup can't overwrite
+// each other's entries with a stale read-modify-write. Expired entries are
+// skipped on read and pruned on the next put.
+
+const VerdictCache = (() => {
+  const STORAGE_KEY = "verdictCache";
+  const MAX_ENTRIES = 500;
+  const IN_BACKGROUND =
+    typeof ServiceWorkerGlobalScope !== "undefined" && self instanceof ServiceWorkerGlobalScope;
+
+  const counters = { hits: 0, misses: 0 }; // this page/worker only
+  let writeQueue = Promise.resolve();
+
+  // Same rule as get_registered_domain() in src/api.py: last two labels.
+  function registeredDomain(hostname) {
+    if (!hostname) return "";
+    const parts = hostname.toLowerCase().split(".");
+    return parts.length >= 2 ? parts.slice(-2).join(".") : hostname.toLowerCase();
+  }
+
+  function keysFor(url) {
+    const parsed = new URL(url);
+    return {
+      url: "u:" + url,
+      domain: "d:" + registeredDomain(parsed.hostname),
+    };
+  }
+
+  async function load() {
+    const stored = await chrome.storage.local.get(STORAGE_KEY);
+    const cache = stored[STORAGE_KEY] || {};
+    return { entries: cache.entries || {} };
+  }
+
+  async function save(cache) {
+    await chrome.storage.local.set({ [STORAGE_KEY]: cache });
+  }
+
+  function fresh(entry, now) {
+    return entry && entry.expiresAt > now;
+  }
+
+  // Returns the cached backend response for this URL, or null. Read-only.
+  async function get(url) {
+    try {
+      const keys = keysFor(url);
+      const cache = await load();
+      const now = Date.now();
+      const entry = [keys.url, keys.domain]
+        .map((k) => cache.entries[k])
+        .find((e) => fresh(e, now));
+
+      counters[entry ? "hits" : "misses"] += 1;
+      return entry ? entry.data : null;
+    } catch (e) {
+      console.warn("VerdictCache → get failed", e);
+      return null;
+    }
+  }
+
+  async function write(url, data, ttl) {
+    const keys = keysFor(url);
+    const key = data.cache_scope === "domain" ? keys.domain : keys.url;
+    const cache = await load();
+    const now = Date.now();
+
+    cache.entries[key] = { data, expiresAt: now + ttl * 1000, storedAt: now };
+
+    // Drop expired entries, then the oldest ones past the bound.
+    let items = Object.entries(cache.entries).filter(([, e]) => fresh(e, now));
+    if (items.length > MAX_ENTRIES) {
+      items.sort((a, b) => (b[1].storedAt || 0) - (a[1].storedAt || 0));
+      items = items.slice(0, MAX_ENTRIES);
+    }
+    cache.entries = Object.fromEntries(items);
+    await save(cache);
+  }
+
+  async function put(url, data) {
+    const ttl = Number(data && data.cache_ttl);
+    if (!ttl || ttl <= 0) return;
+
+    if (!IN_BACKGROUND) {
+      try {
+        await chrome.runtime.sendMessage({ type: "verdictCachePut", url, data });
+      } catch (e) {
+        console.warn("VerdictCache → put failed", e);
+      }
+      return;
+    }
+
+    // Background: one write at a time.
+    const done = writeQueue.then(() => write(url, data, ttl));
+    writeQueue = done.catch((e) => console.warn("VerdictCache → put failed", e));
+    return writeQueue;
+  }
+
+  async function stats() {
+    const cache = await load();
+    return { ...counters, entries: Object.keys(cache.entries).length };
+  }
+
+  return { get, put, stats, registeredDomain };
+})();
@@ -0,0 +1,117 @@
+# admission.py
+"""
+Admission control and graceful degradation for /check_url.
+
+Every request counts against a bounded depth (queued + running). As the
+depth rises, requests are served by cheaper tiers:
+
+    full        ML + Tranco + WHOIS
+    no_whois    ML + Tranco, WHOIS skipped (it's the slow external call)
+    cache_only  cached verdicts only; a miss gets 503
+    reject      503 with Retry-After
+
+A client can also send X-Deadline-Ms; a short deadline picks a cheaper
+tier up front, and work still queued past its deadline is dropped.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+TIER_FULL = "full"
+TIER_NO_WHOIS = "no_whois"
+TIER_CACHE_ONLY = "cache_only"
+TIER_REJECT = "reject"
+TIERS = [TIER_FULL, TIER_NO_WHOIS, TIER_CACHE_ONLY, TIER_REJECT]
+
+MAX_DEPTH = int(os.environ.get("ADMISSION_MAX_DEPTH", "64"))  # per worker
+NO_WHOIS_AT = 0.5       # fraction of MAX_DEPTH
+CACHE_ONLY_AT = 0.8
+
+# Rough per-stage cost, used to degrade for short client deadlines
+WHOIS_BUDGET_MS = 1500
+MODEL_BUDGET_MS = 50
+
+LATENCY_WINDOW = 2048   # recent latencies kept per tier for percentiles
+
+
+class AdmissionController:
+    def __init__(self, max_depth: int = MAX_DEPTH):
+        self.max_depth = max_depth
+        self.depth = 0
+        self._lock = threading.Lock()
+        self.admitted = {t: 0 for t in TIERS}
+        self.deadline_expired = 0
+        self._latencies = {t: deque(maxlen=LATENCY_WINDOW) for t in TIERS}
+
+    def tier_for(self, depth: int, deadline_ms=None) -> str:
+        load = depth / self.max_depth
+        if load >= 1.0:
+            tier = TIER_REJECT
+        elif load >= CACHE_ONLY_AT:
+            tier = TIER_CACHE_ONLY
+        elif load >= NO_WHOIS_AT:
+            tier = TIER_NO_WHOIS
+        else:
+            tier = TIER_FULL
+
+        if deadline_ms is not None:
+            if deadline_ms < MODEL_BUDGET_MS:
+                tier = max(tier, TIER_CACHE_ONLY, key=TIERS.index)
+            elif deadline_ms < WHOIS_BUDGET_MS:
+                tier = max(tier, TIER_NO_WHOIS, key=TIERS.index)
+        return tier
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait: roughly one queue drain."""
+        recent = self._latencies[TIER_FULL] or self._latencies[TIER_NO_WHOIS]
+        per_request = (sum(recent) / len(recent)) if recent else 1.0
+        return max(1, min(30, math.ceil(per_request * self.depth / max(self.max_depth * NO_WHOIS_AT, 1))))
+
+    @contextmanager
+    def admit(self, deadline_ms=None):
+        """
+        Reserve a slot and yield the tier to serve this request with.
+        A rejected request still yields TIER_REJECT (it holds no slot).
+        """
+        with self._lock:
+            tier = self.tier_for(self.depth, deadline_ms)
+            self.admitted[tier] += 1
+            if tier != TIER_REJECT:
+                self.depth += 1
+
+        start = time.perf_counter()
+        try:
+            yield tier
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                if tier != TIER_REJECT:
+                    self.depth -= 1
+                self._latencies[tier].append(elapsed)
+
+    def record_deadline_expired(self):
+        with self._lock:
+            self.deadline_expired += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            latency = {}
+            for tier, values in self._latencies.items():
+                if not values:
+                    continue
+                ordered = sorted(values)
+                latency[tier] = {
+                    "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+                    "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2),
+                }
+            return {
+                "depth": self.depth,
+                "max_depth": self.max_depth,
+                "current_tier": self.tier_for(self.depth),
+                "admitted": dict(self.admitted),
+                "deadline_expired": self.deadline_expired,
+                "latency": latency,
+            }
@@ -1,18 +1,42 @@
 import os
+import hmac
 import json
-import csv
+import time
+import asyncio
+import threading
+from collections import deque
 from datetime import datetime
 from functools import lru_cache
+from typing import Optional
 from urllib.parse import urlparse
 
 import joblib
 import pandas as pd
-from fastapi import FastAPI, HTTPException
+import requests
+import tldextract
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, ValidationError
 import whois  # make sure python-whois is installed
 
 from src.feature_extraction import extract_url_features
+from src.blocklist import Blocklist, default_feed_paths
+from src.hash_prefix import PrefixStore
+from src.profiling import RequestProfiler, SamplingProfiler
+from src.admission import AdmissionController, TIER_CACHE_ONLY, TIER_NO_WHOIS, TIER_REJECT
+from src.verdict_cache import VerdictCache
+from src.readiness import Readiness, DEGRADED, FAILED
+from src.audit_log import AuditLog
+from src.lookalike import (
+    LookalikeIndex, set_default_index, is_idn, lookalike_key, read_tranco,
+    KIND_EXACT, KIND_HOMOGLYPH, KIND_TYPO, KIND_EMBEDDED,
+)
+from src import wire_format
+from src.sharding import ShardRouter, SingleFlight, FORWARD_HEADER, FORWARD_TIMEOUT_SECONDS
 
 # ----------------------------
 # Paths & global objects
@@ -26,6 +50,18 @@ MODEL_DIR = os.path.join(PROJECT_ROOT, "models")
 TRANCODB_PATH = os.path.join(DATA_DIR, "tranco_top1m.csv")
 MODEL_INFO_PATH = os.path.join(MODEL_DIR, "model_info.json")
 
+# Admin endpoints (profiling, ...) are disabled unless this is set
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Verdict audit log (set AUDIT_LOG=0 to turn it off)
+AUDIT_LOG_ENABLED = os.environ.get("AUDIT_LOG", "1") != "0"
+AUDIT_LOG_DIR = os.environ.get("AUDIT_LOG_DIR", os.path.join(DATA_DIR, "audit"))
+
+# Optional domain-affinity sharding: this node's base URL and its peers',
+# e.g. SHARD_SELF=http://10.0.0.1:8000 SHARD_PEERS=http://10.0.0.2:8000,...
+SHARD_SELF = os.environ.get("SHARD_SELF", "").rstrip("/") or None
+SHARD_PEERS = [p.strip().rstrip("/") for p in os.environ.get("SHARD_PEERS", "").split(",") if p.strip()]
+
 app = FastAPI()
 
 app.add_middleware(
@@ -40,6 +76,17 @@ model = None
 scaler = None
 label_encoder = None
 model_info = None
+prefix_store = PrefixStore()
+request_profiler = RequestProfiler()
+sampling_profiler = SamplingProfiler()
+admission = AdmissionController()
+verdict_cache = VerdictCache()
+shard_router = ShardRouter(SHARD_SELF, SHARD_PEERS) if SHARD_SELF and SHARD_PEERS else None
+audit_log = AuditLog(AUDIT_LOG_DIR) if AUDIT_LOG_ENABLED else None
+whois_flight = SingleFlight()  # one WHOIS lookup per domain at a time
+_forward = threading.local()   # per-thread HTTP session for peer forwarding
+_prefix_refresh_lock = threading.Lock()  # one feed reload / prefix rebuild at a time
+readiness = Readiness(["model", "reputation", "suffix_list", "blocklist", "lookalike", "warmup"])
 
 # ----------------------------
 # Hybrid decision constants
@@ -49,6 +96,10 @@ PHISHING_PROB_THRESHOLD = 0.99      # require 99%+ to call phishing
 SUSPICIOUS_PROB_THRESHOLD = 0.90    # “suspicious” if >= 0.90
 MAX_TOP_RANK = 100_000              # Tranco rank threshold for high reputation
 YOUNG_DOMAIN_DAYS = 45              # domains younger than this are “young”
+LOOKALIKE_RULE_RANK = 10_000        # only lookalikes of domains this popular trigger the rule
+LOOKALIKE_PROB_THRESHOLD = 0.6      # ...with at least this ML probability (IDN homoglyphs need none)
+# typos and embedded names hit ordinary words too (login.gov, support.com)
+LOOKALIKE_WEAK_KINDS = {KIND_TYPO, KIND_EMBEDDED}
 
 # Hosting providers that often host *both* legit and phishing sites
 HIGH_REPUTATION_HOSTS = {
@@ -61,6 +112,43 @@ HIGH_REPUTATION_HOSTS = {
     "cloudfront.net",
 }
 
+# Client cache hints per decision_reason: (ttl_seconds, scope).
+# scope "domain" means the verdict holds for every URL on the registered
+# domain; "url" means it only holds for that exact URL.
+VERDICT_CACHE_POLICY = {
+    "known_phishing_url": (6 * 3600, "url"),
+    "known_phishing_host": (6 * 3600, "url"),
+    "high_reputation_or_old_domain": (24 * 3600, "domain"),
+    "ml_high_conf_on_non_high_rep_domain": (3600, "url"),
+    "young_low_rep_and_suspicious": (3600, "url"),
+    "suspicious_subdomain_on_trusted_host": (3600, "url"),
+    "lookalike_of_popular_domain": (3600, "url"),
+    "below_threshold_or_not_suspicious_enough": (600, "url"),
+}
+DEFAULT_CACHE_POLICY = (300, "url")
+WHOIS_FAILED_MAX_TTL = 3600         # don't trust an unknown age for long
+
+PREFIX_REFRESH_SECONDS = 30 * 60    # rebuild extension prefix lists at most this often
+
+# Streaming endpoint limits: at most CHUNK_SIZE * MAX_INFLIGHT_CHUNKS URLs
+# are being scored or buffered at once, whatever the client sends.
+STREAM_CHUNK_SIZE = 64
+STREAM_MAX_INFLIGHT_CHUNKS = 4
+STREAM_MAX_LINE_BYTES = 16 * 1024
+
+BATCH_MAX_URLS = 1000               # per /check_url/batch request
+
+# Synthetic traffic run through predict_internal before reporting ready
+# (WHOIS skipped: it is per-domain and cached, nothing to warm).
+WARMUP_URLS = [
+    "https://www.google.com/",
+    "https://github.com/login",
+    "http://secure-login-verify.account-update.xyz/signin?next=%2Fbilling",
+    "http://192.168.10.5/paypal/verify.php",
+    "https://account-review-center.pages.dev/",
+]
+WARMUP_ROUNDS = 3
+
 PHISHING_KEYWORDS = [
     "account", "review", "verify", "secure", "security",
     "center", "login", "signin", "update", "billing",
@@ -161,25 +249,9 @@ def load_top_domains():
         return top
 
     try:
-        with open(TRANCODB_PATH, newline="", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if not row:
-                    continue
-                # Accept either "rank,domain" or just "domain"
-                if row[0].isdigit() and len(row) >= 2:
-                    rank = int(row[0])
-                    domain = row[1].strip().lower()
-                else:
-                    rank = 1_000_000
-                    domain = row[0].strip().lower()
-
-                # Normalize trailing dot if present: 'facebook.com.' -> 'facebook.com'
-                if domain.endswith("."):
-                    domain = domain[:-1]
-
-                if domain and domain not in top:
-                    top[domain] = rank
+        # same reader as the lookalike_* features
+        for domain, rank in read_tranco(TRANCODB_PATH):
+            top.setdefault(domain, rank)
 
         print(f"✅ [Tranco] Loaded {len(top)} domains.")
         for d in ["facebook.com", "google.com", "github.com", "pages.dev"]:
@@ -190,6 +262,60 @@ def load_top_domains():
     return top
 
 
+@lru_cache(maxsize=1)
+def load_blocklist():
+    """
+    Load the known-phishing blocklist from the local feed files.
+    If nothing can be loaded, returns an empty Blocklist.
+    """
+    bl = Blocklist()
+    try:
+        n = bl.load_feeds()
+        print(f"✅ [Blocklist] Loaded {n} entries:", bl.stats())
+    except Exception as e:
+        print("❌ [Blocklist] Error loading feeds:", e)
+    return bl
+
+
+@lru_cache(maxsize=1)
+def load_lookalike_index():
+    """
+    Lookalike/typosquat index over the Tranco domains up to MAX_TOP_RANK;
+    also used by extract_url_features for the lookalike_* features.
+    """
+    index = LookalikeIndex(load_top_domains().items(), max_rank=MAX_TOP_RANK)
+    set_default_index(index)
+    print("✅ [Lookalike] Index built:", index.stats())
+    return index
+
+
+def refresh_prefix_lists(force: bool = False):
+    """
+    Rebuild the extension hash-prefix lists from the phishing feeds and
+    Tranco, if they are older than PREFIX_REFRESH_SECONDS. New feed entries
+    are also added to the in-memory blocklist (incrementally).
+    Runs on request threads: concurrent callers wait for one rebuild
+    instead of merging the same feeds into the blocklist at once.
+    """
+    def fresh():
+        built_at = prefix_store.lists["bad"].built_at
+        return not force and built_at and time.time() - built_at < PREFIX_REFRESH_SECONDS
+
+    if fresh():
+        return
+    with _prefix_refresh_lock:
+        if fresh():  # rebuilt while we waited
+            return
+        load_blocklist().load_feeds()
+        prefix_store.rebuild(
+            default_feed_paths(),
+            load_top_domains(),
+            MAX_TOP_RANK,
+            exclude_domains=HIGH_REPUTATION_HOSTS,
+        )
+        print("✅ [Prefixes] Rebuilt:", prefix_store.stats()["lists"])
+
+
 def get_domain_reputation(domain: str):
     """
     Return (rank, is_high_reputation).
@@ -233,6 +359,20 @@ def get_domain_age_days(domain: str):
         return None
 
 
+def get_cache_hints(reason: str, reg_domain: str, domain_age_days=None):
+    """
+    Return (cache_ttl, cache_scope) for a verdict.
+    Shared hosting domains (pages.dev, github.io, ...) never get domain
+    scope, since their verdict depends on the subdomain.
+    """
+    ttl, scope = VERDICT_CACHE_POLICY.get(reason, DEFAULT_CACHE_POLICY)
+    if scope == "domain" and reg_domain in HIGH_REPUTATION_HOSTS:
+        scope = "url"
+    if reason == "high_reputation_or_old_domain" and domain_age_days is None:
+        ttl = min(ttl, WHOIS_FAILED_MAX_TTL)
+    return ttl, scope
+
+
 def load_model():
     """
     Load the ML model, scaler (if any), and model_info from MODEL_DIR.
@@ -273,35 +413,136 @@ def load_model():
         label_encoder = None
 
 
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def require_admin(token: Optional[str]):
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+
 def ensure_model_loaded():
     if model is None:
         raise HTTPException(status_code=503, detail="Model not loaded on server.")
 
 
 # ----------------------------
-# Startup
+# Startup & warm-up
 # ----------------------------
 
-@app.on_event("startup")
-async def startup_event():
-    try:
+def file_version(path: str):
+    if not os.path.exists(path):
+        return None
+    return datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat() + "Z"
+
+
+def warm_up():
+    """
+    Eagerly load everything the first request would otherwise load lazily,
+    then run synthetic predictions. Each step is recorded in `readiness`;
+    /ready only turns green once all of them finished.
+    """
+    with readiness.loading("model") as info:
         load_model()
+        lineage = model_info.get("lineage") or [{}]
+        info.update(
+            name=model_info.get("model_name"),
+            version=model_info.get("model_version"),
+            path=model_info.get("model_path"),
+            trained_at=lineage[-1].get("trained_at"),
+        )
         print("✅ Model loaded successfully from", MODEL_DIR)
-    except Exception as e:
-        print("❌ Failed to load model:", e)
+
+    with readiness.loading("reputation") as info:
+        top = load_top_domains()
+        info.update(version=file_version(TRANCODB_PATH), domains=len(top))
+        if not top:
+            info["state"] = DEGRADED
+
+    with readiness.loading("suffix_list") as info:
+        extractor = tldextract.tldextract.TLD_EXTRACTOR
+        info.update(version=tldextract.__version__, suffixes=len(extractor.tlds))
+
+    with readiness.loading("blocklist") as info:
+        stats = load_blocklist().stats()
+        info.update(entries=stats["entries"], feeds=len(default_feed_paths()))
+        if not stats["entries"]:
+            info["state"] = DEGRADED
+
+    with readiness.loading("lookalike") as info:
+        info.update(load_lookalike_index().stats())
+        if not info["names"]:
+            info["state"] = DEGRADED
+
+    with readiness.loading("warmup") as info:
+        ensure_model_loaded()
+        for _ in range(WARMUP_ROUNDS):
+            for url in WARMUP_URLS:
+                predict_internal(url, skip_whois=True)
+        info["predictions"] = WARMUP_ROUNDS * len(WARMUP_URLS)
+
+    status = readiness.status()
+    failed = [n for n, c in status["components"].items() if c["state"] == FAILED]
+    if failed:
+        print("❌ Warm-up incomplete, not ready:", {n: status["components"][n].get("error") for n in failed})
+    else:
+        print(f"✅ Ready after {status['ready_at'] - status['started_at']:.2f}s")
+
+
+@app.on_event("startup")
+async def startup_event():
+    # Off the event loop, so /live answers while we warm up.
+    asyncio.get_running_loop().run_in_executor(None, warm_up)
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    if audit_log is not None:
+        audit_log.close()
+
+
+def audit(verdict: dict, **extra):
+    """Queue a served verdict for the audit log (never blocks)."""
+    if audit_log is not None:
+        audit_log.record(verdict, model_version=(model_info or {}).get("model_version"), **extra)
 
 
 # ----------------------------
 # Core prediction logic
 # ----------------------------
 
-def predict_internal(url: str) -> dict:
+def blocklist_verdict(url: str):
+    """Verdict for a blocklisted URL (exact URL or host), or None."""
+    blocklist_match = load_blocklist().match(url)
+    if not blocklist_match:
+        return None
+    reg_domain = registered_domain_of(url)
+    tranco_rank, _ = get_domain_reputation(reg_domain)
+    reason = f"known_phishing_{blocklist_match}"
+    cache_ttl, cache_scope = get_cache_hints(reason, reg_domain)
+    return {
+        "url": url,
+        "is_phishing": True,
+        "probability": 1.0,
+        "confidence": "high",
+        "domain": reg_domain,
+        "tranco_rank": tranco_rank,
+        "domain_age_days": None,
+        "lookalike_of": None,
+        "lookalike_kind": None,
+        "decision_reason": reason,
+        "cache_ttl": cache_ttl,
+        "cache_scope": cache_scope,
+    }
+
+
+def predict_internal(url: str, skip_whois: bool = False) -> dict:
     """
     Core prediction logic: extract features, apply ML model,
     combine with reputation & domain age to make a final decision.
+    skip_whois=True (used under load) treats the domain age as unknown.
     """
-    ensure_model_loaded()
-
     # Validate URL and extract hostname
     try:
         parsed = urlparse(url)
@@ -315,6 +556,14 @@ def predict_internal(url: str) -> dict:
     reg_domain = get_registered_domain(hostname)
     subdomain = get_subdomain(hostname, reg_domain)
 
+    # 0) Known-phishing blocklist: exact URL/host hits skip ML and WHOIS
+    listed = blocklist_verdict(url)
+    if listed is not None:
+        return listed
+
+    ensure_model_loaded()
+    lookalike_index = load_lookalike_index()
+
     # 1) Extract features from the URL
     try:
         features = extract_url_features(url)
@@ -346,7 +595,11 @@ def predict_internal(url: str) -> dict:
 
     # 4) Get domain reputation and age
     tranco_rank, is_high_rep = get_domain_reputation(reg_domain)
-    domain_age_days = get_domain_age_days(reg_domain)
+    domain_age_days = None if skip_whois else whois_flight.do(reg_domain, get_domain_age_days, reg_domain)
+    # tldextract's registered domain, like the lookalike_* features
+    lookalike = None if is_high_rep else lookalike_index.lookup(*lookalike_key(hostname))
+    if lookalike is not None and lookalike.kind == KIND_EXACT:
+        lookalike = None
 
     # 5) Hybrid decision logic (no hard-coded good sites)
 
@@ -388,6 +641,22 @@ def predict_internal(url: str) -> dict:
         is_phishing = True
         reason = "suspicious_subdomain_on_trusted_host"
 
+    # 7) Extra rule: typo/homoglyph/tld-swap/brand-token lookalike of a popular domain.
+    # Skeletons fold ASCII too (mall -> mail), so only a homoglyph made of
+    # IDN / non-ASCII characters is convincing without the model agreeing;
+    # typos and embedded names need the model to find the URL suspicious.
+    lookalike_hit = (
+        lookalike is not None
+        and lookalike.rank <= LOOKALIKE_RULE_RANK
+        and (probability >= (SUSPICIOUS_PROB_THRESHOLD if lookalike.kind in LOOKALIKE_WEAK_KINDS
+                             else LOOKALIKE_PROB_THRESHOLD)
+             or (lookalike.kind == KIND_HOMOGLYPH and is_idn(hostname)))
+    )
+
+    if lookalike_hit and not is_phishing:
+        is_phishing = True
+        reason = "lookalike_of_popular_domain"
+
     # Confidence bucket (for UI display)
     if probability >= PHISHING_PROB_THRESHOLD:
         confidence = "high"
@@ -396,10 +665,12 @@ def predict_internal(url: str) -> dict:
     else:
         confidence = "low"
 
-    # If we triggered the heuristic rule, make at least medium confidence
-    if suspicious_on_trusted and confidence == "low":
+    # If we triggered a heuristic rule, make at least medium confidence
+    if (suspicious_on_trusted or lookalike_hit) and confidence == "low":
         confidence = "medium"
 
+    cache_ttl, cache_scope = get_cache_hints(reason, reg_domain, domain_age_days)
+
     return {
         "url": url,
         "is_phishing": bool(is_phishing),
@@ -408,10 +679,139 @@ def predict_internal(url: str) -> dict:
         "domain": reg_domain,
         "tranco_rank": tranco_rank,
         "domain_age_days": domain_age_days,
+        "lookalike_of": lookalike.domain if lookalike else None,
+        "lookalike_kind": lookalike.kind if lookalike else None,
         "decision_reason": reason,
+        "cache_ttl": cache_ttl,
+        "cache_scope": cache_scope,
     }
 
 
+# ----------------------------
+# Streaming (NDJSON) scoring
+# ----------------------------
+
+def score_stream_line(line_no: int, line: str) -> dict:
+    """
+    Score one line of a stream: either a bare URL or a JSON object with a
+    "url" field (other fields are echoed back). Errors are reported per line;
+    line is None for a line over STREAM_MAX_LINE_BYTES. Each line is admitted
+    like a /check_url request, so under load streams degrade (no WHOIS, then
+    cache only, then 503 lines) instead of holding threads on full scoring.
+    """
+    if line is None:
+        return {"line": line_no, "error": "Line too long.", "status": 413}
+    extra = {}
+    url = line
+    if line.startswith("{"):
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            return {"line": line_no, "error": f"Invalid JSON: {e}", "status": 400}
+        if not isinstance(obj, dict) or not isinstance(obj.get("url"), str):
+            return {"line": line_no, "error": "Missing 'url' field.", "status": 400}
+        url = obj.pop("url")
+        extra = obj
+
+    with admission.admit(None) as tier:
+        if tier == TIER_REJECT:
+            return {"line": line_no, "url": url, "error": "Server overloaded.", "status": 503, **extra}
+        try:
+            result, cached = quick_verdict(url, tier)
+            if result is None:
+                if tier == TIER_CACHE_ONLY:
+                    return {"line": line_no, "url": url, "error": "Server overloaded; no cached verdict.",
+                            "status": 503, **extra}
+                result = score_url(url, tier)
+        except HTTPException as e:
+            return {"line": line_no, "url": url, "error": e.detail, "status": e.status_code, **extra}
+        except Exception as e:
+            return {"line": line_no, "url": url, "error": str(e), "status": 500, **extra}
+    audit(result, endpoint="stream", service_tier=tier, cached=cached)
+    return {"line": line_no, **result, "url": url, "service_tier": tier, "cached": cached, **extra}
+
+
+def score_stream_chunk(chunk) -> str:
+    return "".join(json.dumps(score_stream_line(n, line)) + "\n" for n, line in chunk)
+
+
+async def iter_body_lines(request: Request):
+    """
+    Yield (line_no, text) for each non-empty line of the request body,
+    reading the body incrementally. Over-long lines are yielded as None.
+    """
+    buffer = b""
+    line_no = 0
+    skipping = False  # inside an over-long line, drop bytes until newline
+    async for data in request.stream():
+        *lines, buffer = (buffer + data).split(b"\n")
+        for raw in lines:
+            if skipping:
+                skipping = False
+                continue
+            line_no += 1
+            if len(raw) > STREAM_MAX_LINE_BYTES:
+                yield line_no, None
+                continue
+            text = raw.decode("utf-8", errors="replace").strip()
+            if text:
+                yield line_no, text
+        if len(buffer) > STREAM_MAX_LINE_BYTES:
+            if not skipping:
+                line_no += 1
+                yield line_no, None
+            skipping = True
+            buffer = b""
+    if buffer and not skipping:
+        text = buffer.decode("utf-8", errors="replace").strip()
+        if text:
+            yield line_no + 1, text
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator reads the request body itself.
+    The stock class listens for disconnect on receive() in parallel, which
+    would swallow the body messages; here a disconnect surfaces through
+    request.stream() or a failed send instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+async def stream_scores(request: Request):
+    """
+    Score body lines in chunks on the threadpool and yield NDJSON in input
+    order. The body is only read further once the client has consumed
+    earlier results, so a fast producer is throttled by a slow consumer.
+    """
+    pending = deque()
+    chunk = []
+    try:
+        async for line_no, text in iter_body_lines(request):
+            # over-long lines (text None) stay in the chunk to keep their place
+            chunk.append((line_no, text))
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                pending.append(asyncio.ensure_future(run_in_threadpool(score_stream_chunk, chunk)))
+                chunk = []
+                if len(pending) >= STREAM_MAX_INFLIGHT_CHUNKS:
+                    yield await pending.popleft()
+        if chunk:
+            pending.append(asyncio.ensure_future(run_in_threadpool(score_stream_chunk, chunk)))
+        while pending:
+            yield await pending.popleft()
+    finally:
+        # Client went away: don't leave scored chunks nobody will read.
+        for task in pending:
+            task.cancel()
+
+
 # ----------------------------
 # API routes
 # ----------------------------
@@ -421,10 +821,365 @@ def root():
     return {"status": "ok", "message": "Phishing detection API running"}
 
 
-@app.post("/check_url")
-def predict(request: URLRequest):
+@app.get("/live")
+def live():
+    """
+    Liveness: the process is up and serving HTTP.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness: model, reputation index, suffix list and blocklist loaded and
+    warmed up. 503 until then, so load balancers skip cold workers.
+    """
+    status = readiness.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+def registered_domain_of(url: str) -> str:
+    try:
+        return get_registered_domain((urlparse(url).hostname or "").lower())
+    except ValueError:
+        return ""
+
+
+def quick_verdict(url: str, tier: str):
+    """
+    (verdict, cached) for a URL answerable without scoring at this tier, or
+    (None, False). The blocklist is checked first and answers at every tier:
+    a domain-scoped "safe" entry (or one cached before the URL was listed)
+    must not answer for a known phishing URL, and a listed URL costs nothing
+    to answer even when the server is only serving from cache.
+    """
+    listed = blocklist_verdict(url)
+    if listed is not None:
+        return listed, False
+    cached = verdict_cache.get(url, registered_domain_of(url), tier)
+    return cached, cached is not None
+
+
+def score_url(url: str, tier: str, profile: bool = False, deadline: Optional[float] = None) -> dict:
+    """
+    Run predict_internal for an admitted request (on the threadpool).
+    Work whose client deadline already passed while queued is dropped.
+    """
+    if deadline is not None and time.monotonic() > deadline:
+        admission.record_deadline_expired()
+        raise HTTPException(status_code=503, detail="Deadline exceeded before processing.",
+                            headers={"Retry-After": str(admission.retry_after())})
+    skip_whois = tier == TIER_NO_WHOIS
+    if request_profiler.should_profile(profile):
+        result = request_profiler.run(url, predict_internal, url, skip_whois=skip_whois)
+    else:
+        result = predict_internal(url, skip_whois=skip_whois)
+    verdict_cache.put(result, tier)
+    return result
+
+
+def forward_to_owner(owner: str, url: str, deadline_ms: Optional[float]):
+    """
+    Send a /check_url request on to the node owning its domain.
+    Returns (status, body, headers), or None if the owner is unreachable
+    (it is then taken off the ring for a while).
+    """
+    if not hasattr(_forward, "session"):
+        _forward.session = requests.Session()
+    headers = {FORWARD_HEADER: shard_router.self_node}
+    if deadline_ms is not None:
+        headers["X-Deadline-Ms"] = str(deadline_ms)
+    try:
+        r = _forward.session.post(owner + "/check_url", json={"url": url}, headers=headers,
+                                  timeout=FORWARD_TIMEOUT_SECONDS)
+        body = r.json()
+    except (requests.RequestException, ValueError):
+        shard_router.mark_down(owner)
+        return None
+    shard_router.record_forwarded()
+    if r.status_code == 200:
+        body["served_by"] = owner
+    retry_after = r.headers.get("Retry-After")
+    return r.status_code, body, {"Retry-After": retry_after} if retry_after else None
+
+
+async def check_one(url: str, x_profile: Optional[str], x_deadline_ms: Optional[float],
+                    x_shard_forwarded: Optional[str]) -> dict:
+    """
+    Verdict for one /check_url request (forwarding, admission, cache,
+    scoring, audit). Errors are raised as HTTPException.
+    """
+    if shard_router is not None:
+        if x_shard_forwarded is not None:
+            shard_router.record_received()
+        else:
+            owner = shard_router.owner(registered_domain_of(url))
+            if owner != shard_router.self_node:
+                forwarded = await run_in_threadpool(forward_to_owner, owner, url, x_deadline_ms)
+                if forwarded is not None:
+                    status, body, headers = forwarded
+                    if status != 200:
+                        raise HTTPException(status_code=status, detail=body.get("detail"), headers=headers)
+                    return body
+
+    with admission.admit(x_deadline_ms) as tier:
+        if tier == TIER_REJECT:
+            raise HTTPException(status_code=503, detail="Server overloaded.",
+                                headers={"Retry-After": str(admission.retry_after())})
+
+        quick, cached = quick_verdict(url, tier)
+        if quick is not None:
+            result = {**quick, "url": url, "service_tier": tier, "cached": cached}
+            audit(result, endpoint="check_url", service_tier=tier, cached=cached)
+            return result
+        if tier == TIER_CACHE_ONLY:
+            raise HTTPException(status_code=503, detail="Server overloaded; no cached verdict.",
+                                headers={"Retry-After": str(admission.retry_after())})
+
+        deadline = time.monotonic() + x_deadline_ms / 1000 if x_deadline_ms is not None else None
+        profile = x_profile is not None and is_admin(x_profile)
+        result = await run_in_threadpool(score_url, url, tier, profile, deadline)
+        audit(result, endpoint="check_url", service_tier=tier, cached=False)
+        return {**result, "service_tier": tier, "cached": False}
+
+
+def negotiate(request: Request):
+    try:
+        return wire_format.negotiate(request.headers.get("content-type"), request.headers.get("accept"))
+    except wire_format.UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+
+def wire_request_body(model):
+    """OpenAPI description of a body accepted as JSON, MessagePack or struct."""
+    schema = model.model_json_schema() if hasattr(model, "model_json_schema") else model
+    return {"requestBody": {"required": True, "content": {
+        wire_format.JSON: {"schema": schema},
+        wire_format.MSGPACK: {"schema": schema},
+        wire_format.STRUCT: {"schema": {"type": "string", "format": "binary"}},
+    }}}
+
+
+@app.post("/check_url", openapi_extra=wire_request_body(URLRequest))
+async def predict(request: Request, x_profile: Optional[str] = Header(None),
+                  x_deadline_ms: Optional[float] = Header(None),
+                  x_shard_forwarded: Optional[str] = Header(None)):
     """
     Main endpoint for the Chrome extension:
     accepts: { "url": "<current tab URL>" }
+    Send 'X-Profile: <admin token>' to capture a cProfile of this request,
+    and 'X-Deadline-Ms' to say how long you are willing to wait.
+    The response's "service_tier" tells how much of the pipeline ran.
+    With sharding on, requests for domains owned by a peer are forwarded
+    there (once); if the peer is down we answer locally.
+    Gateways can send/accept MessagePack or the struct format instead of
+    JSON (see wire_format.py); errors are always JSON.
+    """
+    fmt_in, fmt_out = negotiate(request)
+    body = await request.body()
+    if fmt_in == wire_format.JSON:
+        try:
+            url = URLRequest.model_validate_json(body).url
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+    else:
+        try:
+            url = wire_format.decode_urls(body, fmt_in, batch=False)[0]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    result = await check_one(url, x_profile, x_deadline_ms, x_shard_forwarded)
+    if fmt_out == wire_format.JSON:
+        return result
+    return Response(wire_format.encode([result], fmt_out, batch=False), media_type=fmt_out)
+
+
+def score_batch(urls, deadline: Optional[float]):
+    """
+    Score a batch on the threadpool, admitting every URL separately: each
+    one counts against the queue depth and gets the tier the current load
+    (and remaining deadline) allows, exactly like a single /check_url. A big
+    batch therefore degrades, and ends in 503 slots, as the queue fills.
+    """
+    results = []
+    for url in urls:
+        remaining_ms = (deadline - time.monotonic()) * 1000 if deadline is not None else None
+        with admission.admit(remaining_ms) as tier:
+            if tier == TIER_REJECT:
+                results.append({"url": url, "status": 503, "error": "Server overloaded."})
+                continue
+
+            quick, cached = quick_verdict(url, tier)
+            if quick is not None:
+                result = {**quick, "url": url, "service_tier": tier, "cached": cached}
+                audit(result, endpoint="batch", service_tier=tier, cached=cached)
+                results.append(result)
+                continue
+            if tier == TIER_CACHE_ONLY:
+                results.append({"url": url, "status": 503, "error": "Server overloaded; no cached verdict."})
+                continue
+
+            try:
+                result = score_url(url, tier, deadline=deadline)
+            except HTTPException as e:
+                results.append({"url": url, "status": e.status_code, "error": e.detail})
+                continue
+            audit(result, endpoint="batch", service_tier=tier, cached=False)
+            results.append({**result, "service_tier": tier, "cached": False})
+    return results
+
+
+@app.post("/check_url/batch", openapi_extra=wire_request_body(
+    {"type": "object", "properties": {"urls": {"type": "array", "items": {"type": "string"}}}}))
+async def predict_batch(request: Request, x_deadline_ms: Optional[float] = Header(None)):
+    """
+    Score up to BATCH_MAX_URLS URLs in one request: {"urls": [...]} in,
+    {"results": [...]} out in the same order (or the binary equivalents).
+    A failed URL gets {"url", "status", "error"} in its slot.
+    Each URL goes through admission on its own (see score_batch); the
+    batch is scored on this node.
+    """
+    fmt_in, fmt_out = negotiate(request)
+    try:
+        urls = wire_format.decode_urls(await request.body(), fmt_in, batch=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_URLS} URLs per batch.")
+    if admission.tier_for(admission.depth, x_deadline_ms) == TIER_REJECT:
+        raise HTTPException(status_code=503, detail="Server overloaded.",
+                            headers={"Retry-After": str(admission.retry_after())})
+
+    deadline = time.monotonic() + x_deadline_ms / 1000 if x_deadline_ms is not None else None
+    results = await run_in_threadpool(score_batch, urls, deadline)
+    return Response(wire_format.encode(results, fmt_out, batch=True), media_type=fmt_out)
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Admission/degradation, verdict cache, WHOIS, sharding and audit log counters.
+    """
+    return {
+        "admission": admission.stats(),
+        "verdict_cache": verdict_cache.stats(),
+        "whois": {**get_domain_age_days.cache_info()._asdict(), "single_flight": whois_flight.stats()},
+        "sharding": shard_router.stats() if shard_router is not None else None,
+        "audit_log": audit_log.stats() if audit_log is not None else None,
+    }
+
+
+@app.post("/check_url/stream")
+async def predict_stream(request: Request):
+    """
+    Bulk scoring over one connection: newline-delimited URLs (or JSON
+    objects with a "url" field) in, one NDJSON result per line out.
+    """
+    return DuplexStreamingResponse(stream_scores(request), media_type="application/x-ndjson")
+
+
+@app.get("/prefixes")
+def prefix_stats():
+    """
+    Sizes/versions of the hash-prefix lists and sync traffic so far.
+    """
+    refresh_prefix_lists()
+    return prefix_store.stats()
+
+
+@app.get("/prefixes/{list_name}")
+def get_prefixes(list_name: str, version: int = 0):
+    """
+    Hash-prefix list for the extension ('bad' or 'good').
+    Pass the version you already have to get a delta instead of the full list.
+    """
+    refresh_prefix_lists()
+    body = prefix_store.payload(list_name, since=version or None)
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"Unknown prefix list: {list_name}")
+    return body
+
+
+# ----------------------------
+# Admin: profiling
+# ----------------------------
+
+@app.get("/admin/profiles")
+def get_request_profiles(x_admin_token: Optional[str] = Header(None)):
+    """
+    Slowest profiled /check_url requests (admin header or sampled), slowest first.
+    """
+    require_admin(x_admin_token)
+    return {"sample_rate": request_profiler.sample_rate, "profiles": request_profiler.dump()}
+
+
+@app.post("/admin/sampling/start")
+def start_sampling(seconds: float = 30.0, interval_ms: float = 5.0,
+                   x_admin_token: Optional[str] = Header(None)):
+    """
+    Start a time-boxed whole-process sampling profile.
+    """
+    require_admin(x_admin_token)
+    if not sampling_profiler.start(seconds, interval_ms / 1000):
+        raise HTTPException(status_code=409, detail="Sampling profiler already running.")
+    return sampling_profiler.status()
+
+
+@app.post("/admin/sampling/stop")
+def stop_sampling(x_admin_token: Optional[str] = Header(None)):
+    """
+    Stop the sampling profile early and return its result.
+    """
+    require_admin(x_admin_token)
+    return sampling_profiler.stop() or {}
+
+
+@app.get("/admin/sampling")
+def get_sampling(x_admin_token: Optional[str] = Header(None)):
+    """
+    Status and latest result of the sampling profiler.
+    """
+    require_admin(x_admin_token)
+    return {**sampling_profiler.status(), "result": sampling_profiler.last_result}
+
+
+# ----------------------------
+# Admin: sharding
+# ----------------------------
+
+def require_sharding():
+    if shard_router is None:
+        raise HTTPException(status_code=404, detail="Sharding is not enabled (set SHARD_SELF and SHARD_PEERS).")
+
+
+@app.get("/admin/shards")
+def get_shards(x_admin_token: Optional[str] = Header(None)):
+    """
+    Current ring membership and forwarding counters.
+    """
+    require_admin(x_admin_token)
+    require_sharding()
+    return shard_router.stats()
+
+
+@app.post("/admin/shards/join")
+def join_shard(node: str, x_admin_token: Optional[str] = Header(None)):
+    """
+    Add a node (base URL) to this node's ring.
+    """
+    require_admin(x_admin_token)
+    require_sharding()
+    shard_router.join(node.rstrip("/"))
+    return shard_router.stats()
+
+
+@app.post("/admin/shards/leave")
+def leave_shard(node: str, x_admin_token: Optional[str] = Header(None)):
+    """
+    Remove a node from this node's ring; its domains move to the next nodes.
     """
-    return predict_internal(request.url)
+    require_admin(x_admin_token)
+    require_sharding()
+    shard_router.leave(node.rstrip("/"))
+    return shard_router.stats()
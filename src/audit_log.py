@@ -0,0 +1,263 @@
+# audit_log.py
+"""
+Asynchronous, batched audit log of /check_url verdicts.
+
+record() only appends to an in-memory queue; a background thread writes
+batches (every BATCH_SIZE records or FLUSH_INTERVAL seconds) as NDJSON to
+append-only files that rotate by size and age:
+
+    data/audit/verdicts-<UTC start>-<pid>.ndjson
+
+Requests never wait on the disk. If the writer falls behind, records are
+sampled once the queue is half full and dropped once it is full; both are
+counted, as is flush latency.
+
+Audit files are ingest feeds: records carry a "label" field (null until a
+reviewer sets it), so relabeled decisions go straight into training data
+(URLs already in the dataset get their label corrected, see ingest.py):
+
+    python src/audit_log.py relabel reviewed.csv     # url,label of reviewed verdicts
+    python src/ingest.py data/audit/relabeled-*.ndjson
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+AUDIT_DIR = os.environ.get("AUDIT_LOG_DIR", "data/audit")
+MAX_QUEUE = 10_000
+BATCH_SIZE = 512
+FLUSH_INTERVAL = 1.0
+MAX_FILE_BYTES = 64 * 1024 * 1024
+ROTATE_SECONDS = 3600
+PRESSURE_AT = 0.5          # fraction of MAX_QUEUE where sampling starts
+PRESSURE_SAMPLE_RATE = 0.1 # fraction of records kept under pressure
+
+FIELDS = ["url", "domain", "is_phishing", "probability", "confidence",
+          "decision_reason", "tranco_rank", "domain_age_days"]
+
+
+class AuditLog:
+    def __init__(self, directory: str = AUDIT_DIR, max_queue: int = MAX_QUEUE,
+                 batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 max_file_bytes: int = MAX_FILE_BYTES, rotate_seconds: float = ROTATE_SECONDS):
+        self.directory = directory
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.rotate_seconds = rotate_seconds
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self._file = None
+        self._file_path = None
+        self._file_opened = 0.0
+        self._rng = random.Random()
+
+        self.enqueued = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+        self.flushes = 0
+        self.files = 0
+        self._flush_latencies = deque(maxlen=1024)
+
+    # ----------------------------
+    # Hot path
+    # ----------------------------
+
+    def record(self, verdict: dict, **extra):
+        """Queue one verdict; never blocks on I/O."""
+        entry = {"ts": round(time.time(), 3)}
+        for field in FIELDS:
+            entry[field] = verdict.get(field)
+        entry.update(extra)
+        entry["label"] = None
+
+        with self._cond:
+            depth = len(self._queue)
+            if depth >= self.max_queue or self._closed:
+                self.dropped += 1
+                return
+            if depth >= self.max_queue * PRESSURE_AT and self._rng.random() >= PRESSURE_SAMPLE_RATE:
+                self.sampled_out += 1
+                return
+            self._queue.append(entry)
+            self.enqueued += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+                self._thread.start()
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    # ----------------------------
+    # Writer thread
+    # ----------------------------
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._queue) < self.batch_size and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size))]
+                closed = self._closed and not self._queue
+            if batch:
+                self._write(batch)
+            if closed:
+                self._close_file()
+                return
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            f = self._current_file()
+            f.write("".join(json.dumps(e, separators=(",", ":")) + "\n" for e in batch))
+            f.flush()
+        except OSError as e:
+            self.write_errors += 1
+            self.dropped += len(batch)
+            print("❌ [Audit] Write failed:", e)
+            self._close_file()
+            return
+        self._flush_latencies.append(time.perf_counter() - start)
+        self.written += len(batch)
+        self.flushes += 1
+
+    def _current_file(self):
+        if self._file is not None:
+            too_big = self._file.tell() >= self.max_file_bytes
+            too_old = time.time() - self._file_opened >= self.rotate_seconds
+            if too_big or too_old:
+                self._close_file()
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            self._file_path = os.path.join(self.directory, f"verdicts-{stamp}-{os.getpid()}.ndjson")
+            self._file = open(self._file_path, "a", encoding="utf-8")
+            self._file_opened = time.time()
+            self.files += 1
+        return self._file
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def close(self, timeout: float = 5.0):
+        """Flush what is queued and stop the writer."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._cond:
+            latencies = sorted(self._flush_latencies)
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "sampled_out": self.sampled_out,
+                "dropped": self.dropped,
+                "write_errors": self.write_errors,
+                "flushes": self.flushes,
+                "files": self.files,
+                "current_file": self._file_path,
+                "flush_p50_ms": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+                "flush_max_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+            }
+
+
+# ----------------------------
+# Offline: reading and relabeling
+# ----------------------------
+
+def audit_paths(directory: str = AUDIT_DIR):
+    return sorted(glob.glob(os.path.join(directory, "verdicts-*.ndjson")))
+
+
+def iter_records(paths=None):
+    """Stream audit records; a torn last line (file still being written) is skipped."""
+    for path in paths if paths is not None else audit_paths():
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def relabel(reviewed_csv: str, out_path: str, directory: str = AUDIT_DIR) -> dict:
+    """
+    Join reviewer labels (url,label CSV) onto the latest audit record for
+    each URL and write them as an ingestable NDJSON feed.
+    """
+    labels = {}
+    with open(reviewed_csv, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("url") and row.get("label") not in (None, ""):
+                labels[row["url"].strip()] = int(float(row["label"]))
+
+    latest = {}
+    for rec in iter_records(audit_paths(directory)):
+        if rec.get("url") in labels:
+            latest[rec["url"]] = rec
+
+    flipped = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        for url, label in labels.items():
+            rec = latest.get(url, {"url": url})
+            rec["label"] = label
+            if rec.get("is_phishing") is not None and int(rec["is_phishing"]) != label:
+                flipped += 1
+            out.write(json.dumps(rec, separators=(",", ":")) + "\n")
+    return {"reviewed": len(labels), "matched": len(latest), "flipped": flipped, "out": out_path}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verdict audit log tools.")
+    parser.add_argument("--dir", default=AUDIT_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="decision counts over the audit files")
+    p = sub.add_parser("relabel", help="write reviewed labels as an ingest feed")
+    p.add_argument("reviewed_csv")
+    p.add_argument("--out", help="default: <dir>/relabeled-<ts>.ndjson")
+    args = parser.parse_args()
+
+    if args.cmd == "stats":
+        reasons, versions, n = Counter(), Counter(), 0
+        for rec in iter_records(audit_paths(args.dir)):
+            n += 1
+            reasons[rec.get("decision_reason")] += 1
+            versions[rec.get("model_version")] += 1
+        print(f"{n} verdicts in {len(audit_paths(args.dir))} files")
+        for reason, count in reasons.most_common():
+            print(f"  {reason}: {count}")
+        print("By model version:", dict(versions))
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        out = args.out or os.path.join(args.dir, f"relabeled-{stamp}.ndjson")
+        result = relabel(args.reviewed_csv, out, args.dir)
+        print(f"{result['reviewed']} reviewed, {result['matched']} found in the audit log, "
+              f"{result['flipped']} disagree with the served verdict -> {out}")
+        print(f"Ingest with: python src/ingest.py {out}")
+
+
+if __name__ == "__main__":
+    main()
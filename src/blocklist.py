@@ -0,0 +1,457 @@
+# blocklist.py
+"""
+Known-phishing blocklist used as an exact-match fast path by the API.
+
+Confirmed phishing URLs (and bare phishing hosts) are loaded from local feed
+files into two layers:
+  - a Bloom filter, so most clean URLs are rejected with a few bit probes
+  - a sorted array of 64-bit hashes, which confirms Bloom hits exactly
+
+Memory is ~8 bytes per entry for the sorted array plus ~1.8 bytes per entry
+for the Bloom filter at a 0.1% error rate, so a few million entries stay in
+the tens of MB. New entries go into a small pending set and are merged into
+the sorted array in batches, so updates never need a full rebuild.
+"""
+import csv
+import glob
+import hashlib
+import json
+import math
+import os
+import random
+import subprocess
+from urllib.parse import urlparse
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FEED_DIR = os.path.join(PROJECT_ROOT, "data", "raw", "feeds")
+REAL_URLS_PATH = os.path.join(PROJECT_ROOT, "data", "raw", "real_urls.csv")
+
+DEFAULT_CAPACITY = 1_000_000
+DEFAULT_ERROR_RATE = 0.001
+MIN_PENDING = 4096  # merge pending hashes into the sorted array past this size
+BLOOM_ADD_CHUNK = 1 << 20  # hashes per vectorized Bloom insert when rebuilding
+
+
+# Bytes the browser's URL parser (WHATWG) percent-encodes, besides
+# controls, space and non-ASCII. Existing %XX escapes are kept as they are.
+PATH_ENCODE = set(b'"#<>?`{}')
+QUERY_ENCODE = set(b'"#<>\'')
+DOT_SEGMENTS = {".", "%2e"}
+DOUBLE_DOT_SEGMENTS = {"..", ".%2e", "%2e.", "%2e%2e"}
+
+
+def _percent_encode(text: str, encode: set) -> str:
+    if text.isascii() and not any(ord(c) <= 0x20 or ord(c) == 0x7F or ord(c) in encode for c in text):
+        return text
+    return "".join(
+        f"%{b:02X}" if b <= 0x20 or b >= 0x7F or b in encode else chr(b)
+        for b in text.encode("utf-8")
+    )
+
+
+def _resolve_dot_segments(path: str) -> str:
+    """'/a/./b/../c' -> '/a/c', the way the browser resolves paths."""
+    segments = path.split("/")[1:]
+    out = []
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        lowered = segment.lower()
+        if lowered in DOUBLE_DOT_SEGMENTS:
+            if out:
+                out.pop()
+            if last:
+                out.append("")
+        elif lowered in DOT_SEGMENTS:
+            if last:
+                out.append("")
+        else:
+            out.append(segment)
+    return "/" + "/".join(out)
+
+
+def normalize_host(host: str) -> str:
+    """Lowercase, no trailing dot, internationalized labels as punycode."""
+    host = (host or "").strip().lower().rstrip(".")
+    if not host.isascii():
+        try:
+            host = ".".join(
+                label.encode("idna").decode("ascii") if not label.isascii() else label
+                for label in host.split(".")
+            )
+        except UnicodeError:
+            pass
+    if ":" in host and not host.startswith("["):  # IPv6 literal, bracketed as in the browser
+        host = f"[{host}]"
+    return host
+
+
+def normalize_url(url: str):
+    """
+    Canonical form used for exact matching, or None if not an HTTP(S) URL.
+    Scheme, fragment, default ports and case of the host are ignored:
+    'HTTP://Evil.com:80/Login#x' -> 'evil.com/Login'
+
+    This is the form the extension computes from the browser's URL
+    (hash_prefix.js normalizeUrl): punycode host, percent-encoded path and
+    query, dot segments resolved. The two must agree exactly, or feed
+    entries never match on the extension; `python src/blocklist.py
+    --parity` compares them on PARITY_URLS.
+    """
+    if not isinstance(url, str):
+        return None
+    url = url.strip()
+    if not url:
+        return None
+    try:
+        parsed = urlparse(url)
+        port = parsed.port
+    except ValueError:
+        return None
+    if parsed.scheme.lower() not in ("http", "https"):
+        return None
+
+    host = normalize_host(parsed.hostname)
+    if not host:
+        return None
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = _resolve_dot_segments(_percent_encode((parsed.path or "/").replace("\\", "/"), PATH_ENCODE))
+    key = host + path
+    if parsed.query:
+        key += "?" + _percent_encode(parsed.query, QUERY_ENCODE)
+    return key
+
+
+# Canonical forms that must match the extension's; covers IDN hosts and
+# characters the browser percent-encodes or resolves.
+PARITY_URLS = [
+    "HTTP://Evil.com:80/Login#x",
+    "https://evil.com:8443/a?b=1",
+    "https://evil.com./",
+    "https://evil.com",
+    "https://user:pw@evil.com/login",
+    "http://пример.рф/вход",
+    "https://xn--e1afmkfd.xn--p1ai/%D0%B2%D1%85%D0%BE%D0%B4",
+    "https://bücher.de/über uns?q=straße",
+    "https://PAYPAL.com.ｅxample.com/",
+    "https://evil.com/a/./b/../c",
+    "https://evil.com/a/%2e%2E/b/.",
+    "https://evil.com/x?q=a b&r=\"<>'",
+    "https://evil.com/%7euser/{x}`",
+    "https://evil.com/a\\b",
+    "https://evil.com/?",
+]
+
+
+def check_extension_parity(urls=PARITY_URLS):
+    """
+    Run the extension's normalizeUrl under node on `urls` and return the
+    (url, python, extension) triples that disagree.
+    """
+    script = os.path.join(PROJECT_ROOT, "extension", "scripts", "hash_prefix.js")
+    runner = (
+        "const fs = require('fs'), vm = require('vm');"
+        "const ctx = vm.createContext({ URL, TextEncoder });"
+        "vm.runInContext(fs.readFileSync(process.argv[1], 'utf8') + ';this.HashPrefix = HashPrefix;', ctx);"
+        "const urls = JSON.parse(fs.readFileSync(0, 'utf8'));"
+        "console.log(JSON.stringify(urls.map((u) => { try { return ctx.HashPrefix.normalizeUrl(u); }"
+        " catch (e) { return null; } })));"
+    )
+    out = subprocess.run(["node", "-e", runner, script], input=json.dumps(urls),
+                         capture_output=True, text=True, check=True)
+    js = json.loads(out.stdout)
+    return [(u, normalize_url(u), j) for u, j in zip(urls, js) if normalize_url(u) != j]
+
+
+def hash_key(key: str) -> int:
+    """Stable 64-bit hash of a blocklist key."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class BloomFilter:
+    """
+    Plain Bloom filter over 64-bit hashes (double hashing, Kirsch–Mitzenmacher).
+    """
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, h: int):
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        m = self.num_bits
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % m
+
+    def add(self, h: int):
+        bits = self.bits
+        for pos in self._positions(h):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def add_many(self, hashes):
+        """Add a uint64 array of hashes (same positions as add())."""
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        m = np.uint64(self.num_bits)
+        for start in range(0, len(hashes), BLOOM_ADD_CHUNK):
+            h = hashes[start:start + BLOOM_ADD_CHUNK]
+            h1 = h & np.uint64(0xFFFFFFFF)
+            h2 = (h >> np.uint64(32)) | np.uint64(1)
+            for i in range(self.num_hashes):
+                pos = (h1 + np.uint64(i) * h2) % m
+                np.bitwise_or.at(bits, (pos >> np.uint64(3)).astype(np.intp),
+                                 np.left_shift(1, (pos & np.uint64(7)).astype(np.uint8)).astype(np.uint8))
+
+    def __contains__(self, h: int) -> bool:
+        bits = self.bits
+        for pos in self._positions(h):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+
+class Blocklist:
+    """
+    Bloom filter in front of a sorted hash array.
+    Keys are 'u:<normalized url>' for exact URLs and 'h:<host>' for hosts.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(capacity, error_rate)
+        self._sorted = np.empty(0, dtype=np.uint64)
+        self._pending = set()
+        self.num_urls = 0
+        self.num_hosts = 0
+
+    def __len__(self):
+        return len(self._sorted) + len(self._pending)
+
+    # ----------------------------
+    # Updates
+    # ----------------------------
+
+    def _add_hash(self, h: int) -> bool:
+        if self._contains_hash(h):
+            return False
+        if len(self) + 1 > self.bloom.capacity:
+            self._grow()
+        self.bloom.add(h)
+        self._pending.add(h)
+        # Merge threshold grows with the list, so total merge cost stays
+        # O(n log n) however the entries arrive.
+        if len(self._pending) >= max(MIN_PENDING, len(self._sorted) // 8):
+            self._merge_pending()
+        return True
+
+    def add_url(self, url: str) -> bool:
+        key = normalize_url(url)
+        if key is None:
+            return False
+        added = self._add_hash(hash_key("u:" + key))
+        if added:
+            self.num_urls += 1
+        return added
+
+    def add_host(self, host: str) -> bool:
+        host = normalize_host(host)
+        if not host:
+            return False
+        added = self._add_hash(hash_key("h:" + host))
+        if added:
+            self.num_hosts += 1
+        return added
+
+    def add_feed_url(self, url: str) -> bool:
+        """
+        Add one URL from a phishing feed. A feed entry that is just a host
+        ('http://evil.example/') blocks the whole host; anything with a
+        path or query only blocks that exact URL, so a phishing page on a
+        shared host doesn't take down the whole host.
+        """
+        key = normalize_url(url)
+        if key is None:
+            return False
+        added = self.add_url(url)
+        host, _, rest = key.partition("/")
+        if rest == "" and ":" not in host:
+            added = self.add_host(host) or added
+        return added
+
+    def _merge_pending(self):
+        if not self._pending:
+            return
+        # Pending hashes are never already in the array: insert them at
+        # their sorted positions (one linear copy, no Python ints). The new
+        # array is swapped in before pending is cleared, so readers never
+        # see an entry missing from both.
+        pending = np.fromiter(self._pending, dtype=np.uint64, count=len(self._pending))
+        pending.sort()
+        self._sorted = np.insert(self._sorted, np.searchsorted(self._sorted, pending), pending)
+        self._pending.clear()
+
+    def _grow(self):
+        # Only happens when we outgrow the configured capacity: double it
+        # and re-insert, keeping the target error rate. The new filter is
+        # filled before it replaces the old one, so concurrent match()
+        # calls never probe a half-built filter.
+        self._merge_pending()
+        bloom = BloomFilter(self.bloom.capacity * 2, self.error_rate)
+        bloom.add_many(self._sorted)
+        self.bloom = bloom
+
+    # ----------------------------
+    # Lookups
+    # ----------------------------
+
+    def _contains_hash_exact(self, h: int) -> bool:
+        if h in self._pending:
+            return True
+        arr = self._sorted
+        i = int(np.searchsorted(arr, np.uint64(h)))
+        return i < len(arr) and int(arr[i]) == h
+
+    def _contains_hash(self, h: int) -> bool:
+        if h not in self.bloom:
+            return False
+        return self._contains_hash_exact(h)
+
+    def contains_url(self, url: str) -> bool:
+        key = normalize_url(url)
+        return key is not None and self._contains_hash(hash_key("u:" + key))
+
+    def contains_host(self, host: str) -> bool:
+        host = normalize_host(host)
+        return bool(host) and self._contains_hash(hash_key("h:" + host))
+
+    def match(self, url: str):
+        """
+        Return 'url' for an exact URL hit, 'host' for a blocked host,
+        or None if the URL is not on the blocklist.
+        """
+        if not len(self):
+            return None
+        if self.contains_url(url):
+            return "url"
+        try:
+            host = urlparse(url.strip()).hostname
+        except (ValueError, AttributeError):
+            return None
+        if host and self.contains_host(host):
+            return "host"
+        return None
+
+    # ----------------------------
+    # Loading & stats
+    # ----------------------------
+
+    def load_feed_file(self, path: str) -> int:
+        """
+        Load one feed file and return the number of new entries.
+        """
+        added = 0
+        for url in iter_feed_urls(path):
+            if self.add_feed_url(url):
+                added += 1
+        self._merge_pending()
+        return added
+
+    def load_feeds(self, paths=None) -> int:
+        """
+        Load every feed file in `paths` (default: data/raw/feeds/*.txt|*.csv
+        plus the labelled phishing rows of data/raw/real_urls.csv).
+        Can be called again later to pick up new entries incrementally.
+        """
+        if paths is None:
+            paths = default_feed_paths()
+        added = 0
+        for path in paths:
+            if os.path.exists(path):
+                added += self.load_feed_file(path)
+        return added
+
+    def measure_false_positive_rate(self, samples: int = 100_000, seed: int = 0) -> float:
+        """
+        Empirical Bloom filter false-positive rate, probing random keys
+        that are not in the list. (Bloom hits are confirmed against the
+        sorted array, so the final answer is exact up to 64-bit collisions.)
+        """
+        rng = random.Random(seed)
+        false_hits = 0
+        probes = 0
+        while probes < samples:
+            h = hash_key(f"u:probe-{rng.getrandbits(64):016x}.invalid/")
+            if self._contains_hash_exact(h):
+                continue
+            probes += 1
+            if h in self.bloom:
+                false_hits += 1
+        return false_hits / probes if probes else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self),
+            "urls": self.num_urls,
+            "hosts": self.num_hosts,
+            "bloom_bits": self.bloom.num_bits,
+            "bloom_hashes": self.bloom.num_hashes,
+            "bloom_capacity": self.bloom.capacity,
+            "memory_bytes": self.bloom.size_bytes() + self._sorted.nbytes,
+        }
+
+
+def iter_feed_urls(path: str):
+    """
+    Yield phishing URLs from a feed file.
+    .txt: one URL per line. .csv: 'url' column, rows with label != 1 skipped.
+    """
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                if "label" in row and str(row.get("label")).strip() not in ("1", "1.0"):
+                    continue
+                url = (row.get("url") or "").strip()
+                if url:
+                    yield url
+        else:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+
+
+def default_feed_paths():
+    paths = sorted(glob.glob(os.path.join(FEED_DIR, "*.txt")) + glob.glob(os.path.join(FEED_DIR, "*.csv")))
+    if os.path.exists(REAL_URLS_PATH):
+        paths.append(REAL_URLS_PATH)
+    return paths
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if "--parity" in sys.argv:
+        mismatches = check_extension_parity()
+        for url, py, js in mismatches:
+            print(f"MISMATCH {url!r}\n  python:    {py}\n  extension: {js}")
+        print(f"{len(PARITY_URLS) - len(mismatches)}/{len(PARITY_URLS)} URLs canonicalize identically")
+        sys.exit(1 if mismatches else 0)
+
+    bl = Blocklist()
+    t0 = time.perf_counter()
+    n = bl.load_feeds()
+    print(f"Loaded {n} entries in {time.perf_counter() - t0:.2f}s")
+    print("Stats:", bl.stats())
+    print(f"Measured Bloom FPR: {bl.measure_false_positive_rate():.5f} (target {bl.error_rate})")
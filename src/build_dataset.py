@@ -2,9 +2,13 @@
 import pandas as pd
 import requests
 import os
+import sys
+from ingest import ingest
+from fetch_more_data import save_feed, seed_sources
 
 PHISH_URL = "https://raw.githubusercontent.com/openphish/public_feed/refs/heads/main/feed.txt"
 LEGIT_LOCAL = "data/raw/legit_local.csv"   # create this file (one url per row, header 'url')
+PHISH_FEED_DIR = "data/raw/feeds"
 
 def fetch_openphish():
     print("Fetching OpenPhish feed...")
@@ -41,12 +45,28 @@ def build_and_save(phish_df, legit_df, out_path="data/raw/real_urls.csv", sample
     print(f"Saved {len(combined)} rows to {out_path}")
     return combined
 
+def ingest_openphish(phish_df):
+    """
+    Save the fetched feed locally and append unseen URLs (plus the legit
+    list) to the sharded dataset, instead of rebuilding real_urls.csv.
+    """
+    sources = seed_sources()
+    feed_path = save_feed(phish_df, PHISH_FEED_DIR, "openphish")
+    if feed_path:
+        sources.append((feed_path, 1))
+    sources.append((LEGIT_LOCAL, 0))
+    return ingest(sources)
+
 if __name__ == "__main__":
     phish = fetch_openphish()
-    legit = load_legit_local()
-    # If you want to balance 1:1 use sample_neg=len(phish)
-    df = build_and_save(phish, legit, out_path="data/raw/real_urls.csv", sample_neg=None)
-    print(df.head())
+    if "--rebuild" in sys.argv:
+        legit = load_legit_local()
+        # If you want to balance 1:1 use sample_neg=len(phish)
+        df = build_and_save(phish, legit, out_path="data/raw/real_urls.csv", sample_neg=None)
+        print(df.head())
+    else:
+        record = ingest_openphish(phish)
+        print(f"Appended {record['rows_new']} new URLs (run {record['run_id']})")
 
 
 
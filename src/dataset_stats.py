@@ -0,0 +1,297 @@
+# dataset_stats.py
+"""
+One-pass, constant-memory statistics over the feature CSV (or shards).
+
+The file is read in chunks; per chunk we fold in
+  - per-feature count / mean / variance (Welford, merged chunk-wise with
+    Chan's parallel formula), min and max
+  - approximate quantiles (a small KLL-style compactor sketch per feature)
+  - label distribution and per-label feature means
+Every piece has a merge(), so results from separate files/workers combine
+into the same answer as one serial pass.
+
+Usage:
+    python src/dataset_stats.py data/processed/url_feature.csv
+    python src/dataset_stats.py --workers 4 data/raw/shards/part-*.csv
+"""
+import argparse
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+CHUNK_SIZE = 100_000
+SKETCH_K = 256           # items per sketch level; rank error ~ O(log(n/k) / k)
+HEAD_ROWS = 5
+URL_PREVIEW_CHARS = 120
+
+
+class RunningStats:
+    """
+    Count/mean/M2/min/max for a vector of features, updated a chunk at a time.
+    """
+
+    def __init__(self, n_features: int):
+        self.count = np.zeros(n_features)
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.min = np.full(n_features, np.inf)
+        self.max = np.full(n_features, -np.inf)
+
+    def update(self, values: np.ndarray):
+        """values: 2-D array (rows x features); NaNs are ignored per feature."""
+        if values.size == 0:
+            return
+        valid = ~np.isnan(values)
+        n = valid.sum(axis=0).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, np.nansum(values, axis=0) / np.maximum(n, 1), 0.0)
+            m2 = np.nansum((values - mean) ** 2, axis=0)
+            mn = np.where(n > 0, np.nanmin(np.where(valid, values, np.inf), axis=0), np.inf)
+            mx = np.where(n > 0, np.nanmax(np.where(valid, values, -np.inf), axis=0), -np.inf)
+        self._combine(n, mean, m2, mn, mx)
+
+    def _combine(self, n_b, mean_b, m2_b, min_b, max_b):
+        n_a = self.count
+        n = n_a + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean_b - self.mean
+            self.mean = np.where(n > 0, self.mean + delta * n_b / np.maximum(n, 1), 0.0)
+            self.m2 = self.m2 + m2_b + np.where(n > 0, delta ** 2 * n_a * n_b / np.maximum(n, 1), 0.0)
+        self.count = n
+        self.min = np.minimum(self.min, min_b)
+        self.max = np.maximum(self.max, max_b)
+
+    def merge(self, other: "RunningStats"):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def variance(self, ddof: int = 1) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch: level i holds items of weight 2**i; a level
+    past SKETCH_K items is sorted and every other item (random offset) is
+    promoted to the next level.
+    """
+
+    def __init__(self, k: int = SKETCH_K, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self._rng = random.Random(seed)
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.n += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size > self.k:
+                items = np.sort(items)
+                keep = items[-1:] if items.size % 2 else items[:0]
+                items = items[: items.size - keep.size]
+                promoted = items[self._rng.randint(0, 1)::2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = keep
+            level += 1
+
+    def merge(self, other: "QuantileSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for i, items in enumerate(other.levels):
+            self.levels[i] = np.concatenate([self.levels[i], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        if self.n == 0:
+            return [float("nan")] * len(qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(lv.size, 2.0 ** i) for i, lv in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cum = items[order], np.cumsum(weights[order])
+        return [float(items[min(np.searchsorted(cum, q * cum[-1]), items.size - 1)]) for q in qs]
+
+
+class DatasetStats:
+    """
+    Streaming summary of a feature table. Numeric columns are fixed by the
+    first chunk seen; 'label' is tracked separately.
+    """
+
+    def __init__(self, label_col: str = "label", examples_per_label: int = 0):
+        self.label_col = label_col
+        self.examples_per_label = examples_per_label
+        self.columns = None
+        self.numeric = None
+        self.rows = 0
+        self.overall = None
+        self.per_label = {}
+        self.sketches = None
+        self.label_counts = Counter()
+        self.head = None
+        self.examples = {}
+
+    def _init(self, chunk: pd.DataFrame):
+        self.columns = list(chunk.columns)
+        self.numeric = [c for c in chunk.select_dtypes(include=["number"]).columns if c != self.label_col]
+        self.overall = RunningStats(len(self.numeric))
+        self.sketches = {c: QuantileSketch() for c in self.numeric}
+        self.head = chunk.head(HEAD_ROWS).copy()
+
+    def update(self, chunk: pd.DataFrame):
+        if self.columns is None:
+            self._init(chunk)
+        self.rows += len(chunk)
+
+        values = chunk.reindex(columns=self.numeric).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        self.overall.update(values)
+        for i, col in enumerate(self.numeric):
+            self.sketches[col].update(values[:, i])
+
+        if self.label_col in chunk.columns:
+            labels = chunk[self.label_col]
+            for label, idx in labels.groupby(labels).groups.items():
+                label = _clean_label(label)
+                self.label_counts[label] += len(idx)
+                mask = labels.index.isin(idx)
+                self.per_label.setdefault(label, RunningStats(len(self.numeric))).update(values[mask])
+                if self.examples_per_label:
+                    have = self.examples.get(label)
+                    need = self.examples_per_label - (0 if have is None else len(have))
+                    if need > 0:
+                        rows = chunk[mask].head(need)
+                        self.examples[label] = rows if have is None else pd.concat([have, rows])
+        return self
+
+    def merge(self, other: "DatasetStats"):
+        """Fold in stats computed over rows that come *after* ours."""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__dict__.update(other.__dict__)
+            return self
+        self.rows += other.rows
+        self.overall.merge(other.overall)
+        for col in self.numeric:
+            self.sketches[col].merge(other.sketches[col])
+        self.label_counts.update(other.label_counts)
+        for label, stats in other.per_label.items():
+            if label in self.per_label:
+                self.per_label[label].merge(stats)
+            else:
+                self.per_label[label] = stats
+        for label, rows in other.examples.items():
+            have = self.examples.get(label)
+            if have is None:
+                self.examples[label] = rows
+            elif len(have) < self.examples_per_label:
+                self.examples[label] = pd.concat([have, rows]).head(self.examples_per_label)
+        return self
+
+    # ----------------------------
+    # Results
+    # ----------------------------
+
+    def variances(self) -> pd.Series:
+        return pd.Series(self.overall.variance(), index=self.numeric)
+
+    def feature_table(self) -> pd.DataFrame:
+        table = pd.DataFrame({
+            "count": self.overall.count,
+            "mean": self.overall.mean,
+            "var": self.overall.variance(),
+            "min": self.overall.min,
+            "max": self.overall.max,
+        }, index=self.numeric)
+        q = pd.DataFrame([self.sketches[c].quantiles([0.25, 0.5, 0.75, 0.99]) for c in self.numeric],
+                         index=self.numeric, columns=["p25", "p50", "p75", "p99"])
+        return table.join(q)
+
+    def label_means(self) -> pd.DataFrame:
+        return pd.DataFrame({label: s.mean for label, s in sorted(self.per_label.items(), key=lambda kv: str(kv[0]))},
+                            index=self.numeric)
+
+    def report(self, source: str, extended: bool = False) -> str:
+        """Text in the format of data/processed/quick_summary.txt."""
+        lines = []
+        lines.append(f"Dataset: {source}")
+        lines.append(f"Rows × Columns: {self.rows} × {len(self.columns or [])}")
+        lines.append("Label counts:")
+        for k, v in self.label_counts.most_common():
+            lines.append(f"  {k} : {v}")
+        lines.append("\nTop 5 numeric features by variance:")
+        for f, v in self.variances().sort_values(ascending=False).head(5).items():
+            lines.append(f"  {f}: {v:.2f}")
+        lines.append("\nFirst 5 example rows:")
+        examples = self.head.copy() if self.head is not None else pd.DataFrame()
+        if "url" in examples.columns:
+            examples["url"] = examples["url"].str.slice(0, URL_PREVIEW_CHARS)
+        lines.append(examples.to_string(index=False))
+
+        if extended:
+            lines.append("\nPer-feature statistics:")
+            lines.append(self.feature_table().to_string(float_format=lambda x: f"{x:.3f}"))
+            lines.append("\nPer-label feature means:")
+            lines.append(self.label_means().to_string(float_format=lambda x: f"{x:.3f}"))
+        return "\n".join(lines)
+
+
+def _clean_label(label):
+    if isinstance(label, float) and label.is_integer():
+        return int(label)
+    if isinstance(label, np.integer):
+        return int(label)
+    return label
+
+
+def stats_for_file(path: str, chunksize: int = CHUNK_SIZE, examples_per_label: int = 0) -> DatasetStats:
+    stats = DatasetStats(examples_per_label=examples_per_label)
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        stats.update(chunk)
+    return stats
+
+
+def compute_stats(paths, chunksize: int = CHUNK_SIZE, workers: int = 1, examples_per_label: int = 0) -> DatasetStats:
+    """
+    Stats over one or more CSV files; with workers > 1 files are processed
+    in parallel and the partial results merged in file order.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    total = DatasetStats(examples_per_label=examples_per_label)
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = pool.map(stats_for_file, paths, [chunksize] * len(paths), [examples_per_label] * len(paths))
+            for part in parts:
+                total.merge(part)
+    else:
+        for path in paths:
+            total.merge(stats_for_file(path, chunksize, examples_per_label))
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="One-pass dataset statistics.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    stats = compute_stats(args.paths, chunksize=args.chunksize, workers=args.workers)
+    print(stats.report(", ".join(args.paths), extended=True))
@@ -3,6 +3,11 @@ import re
 from urllib.parse import urlparse
 import tldextract
 
+try:
+    from src.lookalike import lookalike_features
+except ImportError:  # run as a script from src/
+    from lookalike import lookalike_features
+
 SHORTENERS = [
     "bit.ly", "tinyurl.com", "ow.ly", "t.co", "goo.gl", "is.gd",
     "buff.ly", "adf.ly", "bitly.com", "lc.chat", "shorturl.at"
@@ -64,6 +69,9 @@ def extract_url_features(url:str) -> dict:
     features['long_hostname']=int(len(parsed.netloc)>30)
     features['many_digits']=int(features['count_digits']>5)
 
+    #lookalike of a popular (Tranco) domain: typo, homoglyph, tld swap or brand as a token
+    features.update(lookalike_features(url))
+
     return features
 
 
@@ -1,12 +1,17 @@
 import pandas as pd
 import requests
 import os
+from datetime import datetime
 from tranco import Tranco
+from ingest import ingest, read_manifest, SHARD_DIR
 
 PHISHTANK_API = "https://openphish.com/feed.txt"  # Free feed
 LEGIT_SOURCES = [
     "https://tranco-list.eu/download_daily/Top-100k.csv",  # Top legitimate sites
 ]
+EXISTING_PATH = "data/raw/real_urls.csv"
+PHISH_FEED_DIR = "data/raw/feeds"        # also read by the API blocklist
+LEGIT_FEED_DIR = "data/raw/feeds/legit"
 
 def fetch_phishing_urls():
     """Fetch more phishing URLs from OpenPhish"""
@@ -35,43 +40,46 @@ def fetch_legitimate_urls():
         print(f"Error fetching legitimate URLs: {e}")
         return pd.DataFrame()
 
+def save_feed(df, feed_dir, name):
+    """Save fetched URLs as a dated local feed file (one URL per line)"""
+    if len(df) == 0:
+        return None
+    os.makedirs(feed_dir, exist_ok=True)
+    path = os.path.join(feed_dir, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(df["url"].astype(str)) + "\n")
+    return path
+
+def seed_sources():
+    """First run: seed the dedup index with the existing CSV dataset"""
+    if not read_manifest() and os.path.exists(EXISTING_PATH):
+        print(f"Seeding index from existing dataset {EXISTING_PATH}")
+        return [(EXISTING_PATH, None)]
+    return []
+
 def merge_with_existing():
-    """Merge new data with existing dataset"""
-    existing_path = "data/raw/real_urls.csv"
-    
-    if os.path.exists(existing_path):
-        existing = pd.read_csv(existing_path)
-        print(f"Existing dataset: {len(existing)} URLs")
-    else:
-        existing = pd.DataFrame(columns=["url", "label"])
-        print("No existing dataset found, creating new one")
-    
+    """Fetch new data and append only unseen URLs to the sharded dataset"""
+    sources = seed_sources()
+
     # Fetch new data
-    phish_df = fetch_phishing_urls()
-    legit_df = fetch_legitimate_urls()
-    
-    if len(phish_df) > 0:
-        phish_df['label'] = 1
-    if len(legit_df) > 0:
-        legit_df['label'] = 0
-    
-    # Combine
-    new_data = pd.concat([phish_df, legit_df], ignore_index=True)
-    
-    if len(existing) > 0:
-        combined = pd.concat([existing, new_data], ignore_index=True)
-        combined = combined.drop_duplicates(subset=['url']).reset_index(drop=True)
-    else:
-        combined = new_data.drop_duplicates(subset=['url']).reset_index(drop=True)
-    
-    # Save
-    os.makedirs("data/raw", exist_ok=True)
-    combined.to_csv(existing_path, index=False)
-    print(f"\nSaved {len(combined)} total URLs to {existing_path}")
-    print(f"  Phishing (1): {len(combined[combined['label']==1])}")
-    print(f"  Legitimate (0): {len(combined[combined['label']==0])}")
-    
-    return combined
+    phish_path = save_feed(fetch_phishing_urls(), PHISH_FEED_DIR, "openphish")
+    legit_path = save_feed(fetch_legitimate_urls(), LEGIT_FEED_DIR, "tranco")
+    if phish_path:
+        sources.append((phish_path, 1))
+    if legit_path:
+        sources.append((legit_path, 0))
+
+    if not sources:
+        print("Nothing to ingest")
+        return None
+
+    record = ingest(sources)
+    for src in record["sources"]:
+        print(f"  {src['path']}: {src['rows_new']} new, {src['duplicates']} duplicates, {src['invalid']} invalid")
+    print(f"\nAppended {record['rows_new']} new URLs to {SHARD_DIR} (index size {record['index_size']})")
+    print(f"Export for feature_build.py with: python src/ingest.py --export {EXISTING_PATH}")
+
+    return record
 
 if __name__ == "__main__":
     merge_with_existing()
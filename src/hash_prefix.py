@@ -0,0 +1,173 @@
+# hash_prefix.py
+"""
+Safe-Browsing-style hash-prefix lists for the browser extension.
+
+Two lists are exported:
+  - "bad":  4-byte SHA-256 prefixes of known phishing URLs/hosts
+  - "good": 8-byte SHA-256 prefixes of high-reputation registered domains
+
+Expressions hashed (the extension computes the same ones):
+  - bad:  normalize_url(url), e.g. 'evil.com/login?x=1', and 'host/' for
+          hosts listed on their own (punycode, no port: a host block
+          applies on every port)
+  - good: registered domain, e.g. 'facebook.com'
+
+A bad-prefix hit only means "ask the server"; the good list uses longer
+prefixes because a hit there is trusted without a server round trip.
+Each list is versioned, and clients holding a recent version get a delta
+(additions + removals) instead of the full set.
+"""
+import base64
+import hashlib
+import threading
+import time
+
+from src.blocklist import normalize_url, iter_feed_urls
+
+BAD_PREFIX_LEN = 4
+GOOD_PREFIX_LEN = 8
+MAX_HISTORY = 8  # older versions than this get a full update
+
+
+def expression_hash(expr: str) -> bytes:
+    return hashlib.sha256(expr.encode("utf-8")).digest()
+
+
+def bad_expressions(feed_paths):
+    """Yield the hashed expressions for every URL in the phishing feeds."""
+    for path in feed_paths:
+        try:
+            for url in iter_feed_urls(path):
+                key = normalize_url(url)
+                if key is not None:
+                    yield key
+        except OSError:
+            continue
+
+
+def good_expressions(top_domains: dict, max_rank: int, exclude=()):
+    """Yield registered domains with Tranco rank <= max_rank."""
+    exclude = set(exclude)
+    for domain, rank in top_domains.items():
+        if rank <= max_rank and domain not in exclude:
+            yield domain
+
+
+def build_prefix_set(expressions, prefix_len: int) -> frozenset:
+    return frozenset(expression_hash(e)[:prefix_len] for e in expressions)
+
+
+def encode_prefixes(prefixes) -> str:
+    """Sorted, concatenated, base64-encoded prefixes."""
+    return base64.b64encode(b"".join(sorted(prefixes))).decode("ascii")
+
+
+def checksum(prefixes) -> str:
+    return hashlib.sha256(b"".join(sorted(prefixes))).hexdigest()
+
+
+class PrefixList:
+    """
+    One versioned prefix list, with enough history to serve deltas.
+    """
+
+    def __init__(self, name: str, prefix_len: int):
+        self.name = name
+        self.prefix_len = prefix_len
+        self.version = 0
+        self.prefixes = frozenset()
+        self.history = {}  # version -> prefix set
+        self.built_at = None
+
+    def update(self, prefixes: frozenset) -> bool:
+        """Install a new snapshot; returns False if nothing changed."""
+        self.built_at = time.time()
+        if self.version and prefixes == self.prefixes:
+            return False
+        self.version += 1
+        self.prefixes = prefixes
+        self.history[self.version] = prefixes
+        for v in sorted(self.history)[:-MAX_HISTORY]:
+            del self.history[v]
+        return True
+
+    def payload(self, since=None) -> dict:
+        """
+        Response for a client at version `since`: a delta when we still
+        have that version, otherwise the full set.
+        """
+        base = self.history.get(since) if since else None
+        if base is not None and since != self.version:
+            additions = self.prefixes - base
+            removals = base - self.prefixes
+            full = False
+        elif since == self.version:
+            additions, removals, full = frozenset(), frozenset(), False
+        else:
+            additions, removals, full = self.prefixes, frozenset(), True
+
+        return {
+            "list": self.name,
+            "version": self.version,
+            "prefix_len": self.prefix_len,
+            "full": full,
+            "additions": encode_prefixes(additions),
+            "removals": encode_prefixes(removals),
+            "count": len(self.prefixes),
+            "checksum": checksum(self.prefixes),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "count": len(self.prefixes),
+            "prefix_len": self.prefix_len,
+            "bundle_bytes": len(self.prefixes) * self.prefix_len,
+            "built_at": self.built_at,
+        }
+
+
+class PrefixStore:
+    """
+    Holds the "bad" and "good" lists and tracks how much sync traffic
+    they generate.
+    """
+
+    def __init__(self):
+        self.lists = {
+            "bad": PrefixList("bad", BAD_PREFIX_LEN),
+            "good": PrefixList("good", GOOD_PREFIX_LEN),
+        }
+        self.lock = threading.Lock()
+        self.sync_counts = {"full": 0, "delta": 0, "unchanged": 0}
+        self.sync_bytes = 0
+
+    def rebuild(self, feed_paths, top_domains: dict, max_rank: int, exclude_domains=()):
+        with self.lock:
+            self.lists["bad"].update(build_prefix_set(bad_expressions(feed_paths), BAD_PREFIX_LEN))
+            self.lists["good"].update(
+                build_prefix_set(good_expressions(top_domains, max_rank, exclude_domains), GOOD_PREFIX_LEN)
+            )
+
+    def payload(self, name: str, since=None):
+        prefix_list = self.lists.get(name)
+        if prefix_list is None:
+            return None
+        with self.lock:
+            body = prefix_list.payload(since)
+
+        if body["full"]:
+            self.sync_counts["full"] += 1
+        elif body["additions"] or body["removals"]:
+            self.sync_counts["delta"] += 1
+        else:
+            self.sync_counts["unchanged"] += 1
+        self.sync_bytes += len(body["additions"]) + len(body["removals"])
+        return body
+
+    def stats(self) -> dict:
+        return {
+            "lists": {name: pl.stats() for name, pl in self.lists.items()},
+            "syncs": dict(self.sync_counts),
+            "sync_payload_bytes": self.sync_bytes,
+        }
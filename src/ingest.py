@@ -0,0 +1,408 @@
+# ingest.py
+"""
+Append-only dataset ingestion.
+
+Feed files (local paths, so runs are reproducible offline) are streamed
+line by line, URLs are normalized, and each one is checked against a
+persistent hashed-URL index (SQLite). Only URLs never seen before are
+appended, as a new shard file per run:
+
+    data/raw/shards/part-<run_id>-<n>.csv     (url,label,source)
+    data/raw/shards/relabel-<run_id>-<n>.csv  (url,label,source) label changes
+    data/raw/shards/url_index.sqlite          (8-byte URL hash -> label)
+    data/raw/shards/manifest.jsonl            (one provenance record per run)
+
+A known URL arriving with a different label (e.g. a reviewer correction
+from audit_log.py relabel) updates the index and goes to a relabel shard;
+on export the latest relabel wins over the label in the part shard.
+
+A run costs O(new rows) index lookups; existing shards are never re-read
+or rewritten.
+
+Usage:
+    python src/ingest.py --label 1 data/raw/feeds/openphish-20250101.txt
+    python src/ingest.py --export data/raw/real_urls.csv
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+SHARD_DIR = "data/raw/shards"
+INDEX_NAME = "url_index.sqlite"
+MANIFEST_NAME = "manifest.jsonl"
+SHARD_MAX_ROWS = 1_000_000
+BATCH_SIZE = 10_000
+SHARD_COLUMNS = ["url", "label", "source"]
+
+
+def normalize_url(url: str):
+    """
+    Normalize a URL for storage/dedup, or None if it isn't usable.
+    Adds https:// to bare domains (like build_dataset.load_legit_local),
+    lowercases scheme and host, drops default ports and fragments.
+    """
+    if not isinstance(url, str):
+        return None
+    url = url.strip()
+    if not url:
+        return None
+    if not url.startswith(("http://", "https://", "HTTP://", "HTTPS://")):
+        if "://" in url:
+            return None
+        url = "https://" + url
+    try:
+        parsed = urlparse(url)
+        port = parsed.port
+    except ValueError:
+        return None
+
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").rstrip(".")
+    if not host:
+        return None
+    netloc = host
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        netloc = f"{host}:{port}"
+    if parsed.username:
+        # keep userinfo: 'https://paypal.com@evil.com' is a phishing signal
+        userinfo = parsed.username + (f":{parsed.password}" if parsed.password else "")
+        netloc = f"{userinfo}@{netloc}"
+
+    out = f"{scheme}://{netloc}{parsed.path}"
+    if parsed.query:
+        out += "?" + parsed.query
+    return out
+
+
+def url_hash(url: str) -> int:
+    """
+    Signed 64-bit dedup hash (fits a SQLite INTEGER key).
+    'https://a.com' and 'https://a.com/' count as the same URL.
+    """
+    scheme, sep, rest = url.partition("://")
+    if "/" not in rest and "?" not in rest:
+        url = f"{scheme}{sep}{rest}/"
+    return int.from_bytes(hashlib.sha256(url.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _parse_label(value, default):
+    if value is None or str(value).strip() == "":
+        return default
+    try:
+        return int(float(value))
+    except ValueError:
+        return default
+
+
+def iter_feed(path: str, default_label=None):
+    """
+    Stream (url, label) pairs from a local feed file.
+    .csv: 'url' column (or first column) and optional 'label' column.
+    .ndjson/.jsonl: one JSON object per line with 'url' and optional
+        'label' (e.g. relabeled verdicts from audit_log.py).
+    anything else: one URL per line, '#' comments allowed.
+    """
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        if path.lower().endswith((".ndjson", ".jsonl")):
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(rec, dict) and rec.get("url"):
+                    yield rec["url"], _parse_label(rec.get("label"), default_label)
+        elif path.lower().endswith(".csv"):
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            cols = [c.strip().lower() for c in header]
+            if "url" in cols:
+                url_idx = cols.index("url")
+                label_idx = cols.index("label") if "label" in cols else None
+            else:
+                # headerless: first row is data
+                url_idx, label_idx = 0, None
+                yield header[0], default_label
+            for row in reader:
+                if len(row) <= url_idx:
+                    continue
+                label = row[label_idx] if label_idx is not None and len(row) > label_idx else None
+                yield row[url_idx], _parse_label(label, default_label)
+        else:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line, default_label
+
+
+class UrlIndex:
+    """
+    Persistent set of ingested URL hashes (with their label).
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen (hash INTEGER PRIMARY KEY, label INTEGER) WITHOUT ROWID"
+        )
+        # Row count kept alongside, so we never COUNT(*) the whole index.
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('size', 0)")
+
+    def add_new(self, hashes_labels):
+        """
+        Insert (hash, label) pairs; known hashes get their label updated
+        when a (non-empty) different one comes in.
+        Returns (new hashes, relabeled hashes). Uncommitted until commit().
+        """
+        new, relabeled = set(), set()
+        cur = self.conn.cursor()
+        for h, label in hashes_labels:
+            cur.execute("INSERT OR IGNORE INTO seen (hash, label) VALUES (?, ?)", (h, label))
+            if cur.rowcount == 1:
+                new.add(h)
+            elif label is not None:
+                cur.execute("UPDATE seen SET label = ? WHERE hash = ? AND label IS NOT ?", (label, h, label))
+                if cur.rowcount == 1:
+                    relabeled.add(h)
+        cur.execute("UPDATE meta SET value = value + ? WHERE key = 'size'", (len(new),))
+        return new, relabeled
+
+    def __len__(self):
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'size'").fetchone()[0]
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+class ShardWriter:
+    """
+    Writes new rows to <prefix>-<run_id>-<n>.csv, rolling over at
+    SHARD_MAX_ROWS. Files are written under a .tmp name and renamed when
+    finished.
+    """
+
+    def __init__(self, shard_dir: str, run_id: str, max_rows: int = SHARD_MAX_ROWS, prefix: str = "part"):
+        self.shard_dir = shard_dir
+        self.run_id = run_id
+        self.max_rows = max_rows
+        self.prefix = prefix
+        self.shards = []
+        self._file = None
+        self._writer = None
+        self._rows = 0
+
+    def _open(self):
+        name = f"{self.prefix}-{self.run_id}-{len(self.shards):03d}.csv"
+        path = os.path.join(self.shard_dir, name)
+        self._file = open(path + ".tmp", "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(SHARD_COLUMNS)
+        self._rows = 0
+        self.shards.append({"path": path, "rows": 0})
+
+    def _close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        path = self.shards[-1]["path"]
+        os.replace(path + ".tmp", path)
+        self._file = None
+
+    def write(self, url, label, source):
+        if self._file is None or self._rows >= self.max_rows:
+            self._close()
+            self._open()
+        self._writer.writerow([url, "" if label is None else label, source])
+        self._rows += 1
+        self.shards[-1]["rows"] += 1
+
+    def close(self):
+        self._close()
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+            os.remove(self.shards[-1]["path"] + ".tmp")
+            self._file = None
+        for shard in self.shards:
+            if os.path.exists(shard["path"]):
+                os.remove(shard["path"])
+
+
+def ingest(sources, shard_dir: str = SHARD_DIR, default_label=None):
+    """
+    Ingest feed files. `sources` is a list of paths or (path, label) pairs;
+    label is used for rows that don't carry their own.
+    Returns the provenance record written to the manifest.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + "-" + uuid.uuid4().hex[:6]
+    started = time.time()
+
+    index = UrlIndex(os.path.join(shard_dir, INDEX_NAME))
+    writer = ShardWriter(shard_dir, run_id)
+    relabel_writer = ShardWriter(shard_dir, run_id, prefix="relabel")
+    record = {
+        "run_id": run_id,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "sources": [],
+    }
+
+    try:
+        for source in sources:
+            path, label = source if isinstance(source, tuple) else (source, default_label)
+            stats = {"path": path, "sha256": file_sha256(path), "label": label,
+                     "rows_read": 0, "rows_new": 0, "relabeled": 0, "duplicates": 0, "invalid": 0}
+            source_name = os.path.basename(path)
+
+            batch = []
+
+            def flush():
+                new, relabeled = index.add_new((url_hash(u), lab) for u, lab in batch)
+                for u, lab in batch:
+                    h = url_hash(u)
+                    if h in new:
+                        writer.write(u, lab, source_name)
+                        new.discard(h)  # same URL twice in one batch
+                        stats["rows_new"] += 1
+                    elif h in relabeled:
+                        relabel_writer.write(u, lab, source_name)
+                        relabeled.discard(h)
+                        stats["relabeled"] += 1
+                    else:
+                        stats["duplicates"] += 1
+                batch.clear()
+
+            for raw_url, row_label in iter_feed(path, label):
+                stats["rows_read"] += 1
+                url = normalize_url(raw_url)
+                if url is None:
+                    stats["invalid"] += 1
+                    continue
+                batch.append((url, row_label))
+                if len(batch) >= BATCH_SIZE:
+                    flush()
+            flush()
+            record["sources"].append(stats)
+
+        writer.close()
+        relabel_writer.close()
+        index.commit()
+    except BaseException:
+        writer.abort()
+        relabel_writer.abort()
+        index.rollback()
+        index.close()
+        raise
+
+    record["shards"] = writer.shards
+    record["relabel_shards"] = relabel_writer.shards
+    record["rows_new"] = sum(s["rows_new"] for s in record["sources"])
+    record["relabeled"] = sum(s["relabeled"] for s in record["sources"])
+    record["index_size"] = len(index)
+    record["seconds"] = round(time.time() - started, 3)
+    index.close()
+
+    with open(os.path.join(shard_dir, MANIFEST_NAME), "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    return record
+
+
+def shard_paths(shard_dir: str = SHARD_DIR):
+    return sorted(glob.glob(os.path.join(shard_dir, "part-*.csv")))
+
+
+def relabel_paths(shard_dir: str = SHARD_DIR):
+    return sorted(glob.glob(os.path.join(shard_dir, "relabel-*.csv")))
+
+
+def latest_labels(shard_dir: str = SHARD_DIR):
+    """URL hash -> label from the relabel shards; later runs win."""
+    labels = {}
+    for row in iter_rows(relabel_paths(shard_dir)):
+        labels[url_hash(row["url"])] = row["label"]
+    return labels
+
+
+def read_manifest(shard_dir: str = SHARD_DIR):
+    path = os.path.join(shard_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def iter_rows(paths=None):
+    """Stream every ingested row as a dict (url, label, source)."""
+    for path in paths if paths is not None else shard_paths():
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+def export_csv(out_path: str, shard_dir: str = SHARD_DIR) -> int:
+    """
+    Write all shards to a single url,label CSV (the format feature_build.py
+    reads), streaming row by row, with relabels applied.
+    """
+    relabels = latest_labels(shard_dir)
+    n = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(["url", "label"])
+        for row in iter_rows(shard_paths(shard_dir)):
+            label = relabels.get(url_hash(row["url"]), row.get("label")) if relabels else row.get("label")
+            if label in ("", None):
+                continue
+            writer.writerow([row["url"], label])
+            n += 1
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest URL feed files into the sharded dataset.")
+    parser.add_argument("paths", nargs="*", help="feed files (.txt one URL per line, .csv, or .ndjson)")
+    parser.add_argument("--label", type=int, default=None, help="label for rows without one (1=phishing, 0=legit)")
+    parser.add_argument("--shard-dir", default=SHARD_DIR)
+    parser.add_argument("--export", metavar="CSV", help="write all shards to a url,label CSV")
+    args = parser.parse_args()
+
+    if args.paths:
+        record = ingest(args.paths, shard_dir=args.shard_dir, default_label=args.label)
+        for s in record["sources"]:
+            print(f"{s['path']}: read {s['rows_read']}, new {s['rows_new']}, relabeled {s['relabeled']}, "
+                  f"duplicates {s['duplicates']}, invalid {s['invalid']}")
+        print(f"Run {record['run_id']}: {record['rows_new']} new rows in {record['seconds']}s "
+              f"(index size {record['index_size']})")
+
+    if args.export:
+        n = export_csv(args.export, shard_dir=args.shard_dir)
+        print(f"Exported {n} rows to {args.export}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 #for checking 0 and 1
 # inspect_dataset.py
-import pandas as pd
-df = pd.read_csv("data/raw/real_urls.csv")
-print("Total rows:", len(df))
+from dataset_stats import compute_stats
+
+# streamed in chunks, so this works on datasets bigger than RAM
+stats = compute_stats("data/raw/real_urls.csv", examples_per_label=10)
+print("Total rows:", stats.rows)
 print("Label counts:")
-print(df['label'].value_counts())
+for label, count in stats.label_counts.most_common():
+    print(f"{label}    {count}")
 print("\nA few phishing examples (label=1):")
-print(df[df['label']==1].head(5).to_string(index=False))
+if 1 in stats.examples:
+    print(stats.examples[1].head(5).to_string(index=False))
 print("\nA few legitimate examples (label=0):")
-print(df[df['label']==0].head(10).to_string(index=False))
\ No newline at end of file
+if 0 in stats.examples:
+    print(stats.examples[0].head(10).to_string(index=False))
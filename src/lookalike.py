@@ -0,0 +1,377 @@
+# lookalike.py
+"""
+Lookalike / typosquat index over the Tranco top domains.
+
+Every domain name (the registered domain without its suffix) is reduced
+to a "skeleton": punycode decoded, accents stripped, and confusable
+characters folded together (Cyrillic 'а' -> 'a', '0' -> 'o', '1'/'i' -> 'l',
+'rn' -> 'm', ...). The index is a symmetric-delete one: each skeleton and
+every single-character deletion of it is hashed into a sorted int64 array,
+so a query costs one vectorized searchsorted over ~len(name) hashes plus a
+positional compare of the few candidates -- independent of list size.
+
+Skeletons also fold plain ASCII ('mall' and 'mail' share one), so a
+homoglyph match alone only means something for IDN / non-ASCII names (see
+is_idn). Reported distances are real edit distances between the names,
+not skeleton distances.
+
+lookup() answers with the best-ranked target among:
+    exact      the domain itself is on the list (not a lookalike)
+    tld_swap   same name, different suffix            (paypal.co, paypal.xyz)
+    homoglyph  same skeleton, different characters     (pаypal.com, paypa1.com)
+    typo       skeleton edit distance 1..MAX_DISTANCE   (paypall.com, pyapal.com)
+    embedded   a popular name as a token of the name,  (paypal-secure.net,
+               or a listed domain inside the subdomain  paypal.com.evil.xyz)
+"""
+import csv
+import os
+import threading
+import unicodedata
+from collections import namedtuple
+
+import numpy as np
+import tldextract
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANCO_PATH = os.path.join(PROJECT_ROOT, "data", "tranco_top1m.csv")
+
+DEFAULT_MAX_RANK = 100_000
+UNRANKED = 1_000_000      # rank given to rows of a domain-only list
+MAX_DISTANCE = 2
+MIN_NAME_LEN = 4          # shorter names are 1-2 edits away from too much
+MIN_EMBEDDED_LEN = 5
+MAX_CANDIDATES = 64
+
+KIND_EXACT = "exact"
+KIND_TLD_SWAP = "tld_swap"
+KIND_HOMOGLYPH = "homoglyph"
+KIND_TYPO = "typo"
+KIND_EMBEDDED = "embedded"
+
+LookalikeMatch = namedtuple("LookalikeMatch", ["domain", "rank", "distance", "kind"])
+
+# Characters folded together in skeletons. Applied to both the list and the
+# query, so the mapping only needs to be consistent, not "correct".
+CONFUSABLES = str.maketrans({
+    "0": "o", "1": "l", "i": "l", "|": "l", "5": "s", "$": "s",
+    # Cyrillic
+    "а": "a", "е": "e", "о": "o", "р": "p", "с": "c", "у": "y", "х": "x",
+    "і": "l", "ӏ": "l", "ј": "j", "ѕ": "s", "ԁ": "d", "һ": "h", "ԛ": "q",
+    "ԝ": "w", "ь": "b", "к": "k", "м": "m", "н": "h", "т": "t", "в": "b",
+    # Greek
+    "ο": "o", "α": "a", "ν": "v", "ι": "l", "κ": "k", "ρ": "p", "τ": "t",
+    "υ": "u", "χ": "x", "ε": "e", "η": "n", "β": "b",
+    # Latin lookalikes
+    "ı": "l", "ɡ": "g", "ɑ": "a", "ǀ": "l", "ℓ": "l",
+})
+MULTI_CHAR = [("rn", "m"), ("vv", "w"), ("cl", "d")]
+
+
+def decode_idna(label: str) -> str:
+    if label.startswith("xn--"):
+        try:
+            return label.encode("ascii").decode("idna")
+        except (UnicodeError, ValueError):
+            return label
+    return label
+
+
+def is_idn(name: str) -> bool:
+    """Non-ASCII or punycode labels, i.e. characters ASCII confusables don't explain."""
+    return not name.isascii() or "xn--" in name.lower()
+
+
+def skeleton(name: str) -> str:
+    """Confusable-folded form of a domain name (no suffix)."""
+    name = name.lower()
+    if "xn--" in name:
+        name = ".".join(decode_idna(part) for part in name.split("."))
+    if not name.isascii():
+        name = "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c))
+    name = name.translate(CONFUSABLES)
+    for seq, repl in MULTI_CHAR:
+        if seq in name:
+            name = name.replace(seq, repl)
+    return name
+
+
+def deletes(s: str):
+    return {s[:i] + s[i + 1:] for i in range(len(s))}
+
+
+def osa_distance(a: str, b: str, limit: int = MAX_DISTANCE) -> int:
+    """
+    Optimal string alignment distance (Levenshtein + adjacent swaps),
+    or limit + 1 once it is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # common prefix/suffix don't change the distance; lookalikes share most of theirs
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            v = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                v = min(v, prev2[j - 2] + 1)
+            cur[j] = v
+            row_min = min(row_min, v)
+        if row_min > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return min(prev[-1], limit + 1)
+
+
+def near_distance(a: str, b: str) -> int:
+    """
+    Edit distance of two strings that share a single-deletion variant, which
+    bounds it by 2: a length difference is one deletion, equal lengths are a
+    substitution or adjacent swap (1) or two substitutions (2).
+    """
+    if a == b:
+        return 0
+    if len(a) != len(b):
+        return 1
+    diffs = [k for k in range(len(a)) if a[k] != b[k]]
+    if len(diffs) == 1:
+        return 1
+    i, j = diffs[0], diffs[-1]
+    if len(diffs) == 2 and j == i + 1 and a[i] == b[j] and a[j] == b[i]:
+        return 1
+    return 2
+
+
+def split_domain(domain: str):
+    """'paypal.co.uk' -> ('paypal', 'co.uk'); expects a registered domain."""
+    name, _, suffix = domain.lower().rstrip(".").partition(".")
+    return name, suffix
+
+
+class LookalikeIndex:
+    def __init__(self, domains=(), max_rank: int = DEFAULT_MAX_RANK):
+        """
+        domains: iterable of (domain, rank). Only rank <= max_rank is kept;
+        for names on several suffixes the best-ranked domain represents them.
+        """
+        best = {}  # skeleton -> (rank, domain, name)
+        exact = {}  # hash(domain) -> rank
+        for domain, rank in domains:
+            if max_rank is not None and rank > max_rank:
+                continue
+            domain = domain.lower().rstrip(".")
+            exact[hash(domain)] = min(rank, exact.get(hash(domain), rank))
+            name, _ = split_domain(domain)
+            if "xn--" in name:
+                name = decode_idna(name)
+            sk = skeleton(name)
+            if len(sk) < MIN_NAME_LEN:
+                continue
+            if sk not in best or rank < best[sk][0]:
+                best[sk] = (rank, domain, name)
+
+        self.max_rank = max_rank
+        self.domains = []
+        self.names = []
+        self.skeletons = []
+        ranks = []
+        hashes, ids = [], []
+        full_hashes = []
+        for i, (sk, (rank, domain, name)) in enumerate(best.items()):
+            self.domains.append(domain)
+            self.names.append(name)
+            self.skeletons.append(sk)
+            ranks.append(rank)
+            full_hashes.append(hash(sk))
+            for variant in deletes(sk) | {sk}:
+                hashes.append(hash(variant))
+                ids.append(i)
+
+        self.ranks = np.array(ranks, dtype=np.int32)
+        order = np.argsort(np.array(hashes, dtype=np.int64), kind="stable")
+        self._hashes = np.array(hashes, dtype=np.int64)[order]
+        self._ids = np.array(ids, dtype=np.int32)[order]
+        full = np.array(full_hashes, dtype=np.int64)
+        full_order = np.argsort(full, kind="stable")
+        self._full_hashes = full[full_order]
+        self._full_ids = full_order.astype(np.int32)
+        exact_hashes = np.fromiter(exact.keys(), dtype=np.int64, count=len(exact))
+        exact_order = np.argsort(exact_hashes, kind="stable")
+        self._exact = exact_hashes[exact_order]
+        self._exact_ranks = np.fromiter(exact.values(), dtype=np.int32, count=len(exact))[exact_order]
+
+    def __len__(self):
+        return len(self.domains)
+
+    def _candidates(self, sk: str):
+        keys = np.array([hash(sk)] + [hash(v) for v in deletes(sk)], dtype=np.int64)
+        lo = np.searchsorted(self._hashes, keys, side="left")
+        hi = np.searchsorted(self._hashes, keys, side="right")
+        found = set()
+        for a, b in zip(lo.tolist(), hi.tolist()):
+            if b > a:
+                found.update(self._ids[a:b].tolist())
+                if len(found) >= MAX_CANDIDATES:
+                    break
+        return found
+
+    def _by_skeleton(self, sk: str):
+        lo = np.searchsorted(self._full_hashes, hash(sk), side="left")
+        hi = np.searchsorted(self._full_hashes, hash(sk), side="right")
+        for k in range(lo, hi):
+            i = int(self._full_ids[k])
+            if self.skeletons[i] == sk:
+                return i
+        return None
+
+    def _match(self, i, name, kind):
+        # real edit distance of the (decoded) names, whatever matched them
+        distance = osa_distance(name, self.names[i], limit=max(len(name), len(self.names[i])))
+        return LookalikeMatch(self.domains[i], int(self.ranks[i]), distance, kind)
+
+    def lookup(self, domain: str, subdomain: str = ""):
+        """
+        Nearest popular domain to a registered domain (plus, optionally, its
+        subdomain for embedded brand names), or None.
+        """
+        if not domain or not len(self):
+            return None
+        domain = domain.lower().rstrip(".")
+        name, _ = split_domain(domain)
+        if "xn--" in name:
+            name = decode_idna(name)
+        rank = self._exact_rank(domain)
+        if rank is not None:
+            return LookalikeMatch(domain, rank, 0, KIND_EXACT)
+
+        sk = skeleton(name)
+        if len(sk) >= MIN_NAME_LEN:
+            # one target per skeleton, so a same-skeleton hit can't be beaten
+            i = self._by_skeleton(sk)
+            if i is not None:
+                return self._match(i, name, KIND_TLD_SWAP if self.names[i] == name else KIND_HOMOGLYPH)
+            nearest = None  # (skeleton distance, rank, index)
+            for i in self._candidates(sk):
+                other = self.skeletons[i]
+                if abs(len(other) - len(sk)) > 1:  # int64 hash collision
+                    continue
+                key = (near_distance(sk, other), int(self.ranks[i]), i)
+                if nearest is None or key < nearest:
+                    nearest = key
+            if nearest is not None:
+                return self._match(nearest[2], name, KIND_TYPO)
+
+        # Embedded names. Plain subdomain labels are not matched on their own
+        # ('login.example.com' is not 'login.gov'); only hyphen tokens of the
+        # name itself and whole listed domains spelled out in the subdomain.
+        found = None  # (rank, match)
+        for token in set(name.split("-")) if "-" in name else ():
+            token_sk = skeleton(token)
+            if len(token_sk) < MIN_EMBEDDED_LEN:
+                continue
+            i = self._by_skeleton(token_sk)
+            if i is not None and (found is None or self.ranks[i] < found[0]):
+                found = (int(self.ranks[i]), self._match(i, decode_idna(token), KIND_EMBEDDED))
+        labels = subdomain.lower().split(".") if subdomain else []
+        for start in range(len(labels) - 1):
+            if len(labels[start]) < MIN_NAME_LEN:
+                continue
+            for end in range(start + 2, min(start + 3, len(labels)) + 1):
+                candidate = ".".join(labels[start:end])
+                rank = self._exact_rank(candidate)
+                if rank is not None and (found is None or rank < found[0]):
+                    found = (rank, LookalikeMatch(candidate, rank, 0, KIND_EMBEDDED))
+        return found[1] if found else None
+
+    def _exact_rank(self, domain: str):
+        h = hash(domain)
+        k = np.searchsorted(self._exact, h)
+        if k < len(self._exact) and self._exact[k] == h:
+            return int(self._exact_ranks[k])
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "names": len(self),
+            "max_rank": self.max_rank,
+            "index_entries": int(self._hashes.size),
+            "memory_bytes": int(self._hashes.nbytes + self._ids.nbytes + self._full_hashes.nbytes
+                                + self._full_ids.nbytes + self._exact.nbytes + self._exact_ranks.nbytes
+                                + self.ranks.nbytes),
+        }
+
+
+# ----------------------------
+# Shared index for the feature pipeline / API
+# ----------------------------
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def read_tranco(path: str = TRANCO_PATH):
+    """
+    (domain, rank) pairs from a 'rank,domain' (or 'domain') CSV, domains
+    lowercased without a trailing dot. The API's reputation lookup reads the
+    list through here too, so features and serving agree on every rank.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row:
+                continue
+            if row[0].isdigit() and len(row) >= 2:
+                rank, domain = int(row[0]), row[1]
+            else:
+                rank, domain = UNRANKED, row[0]
+            domain = domain.strip().lower().rstrip(".")
+            if domain:
+                yield domain, rank
+
+
+def set_default_index(index: LookalikeIndex):
+    global _default
+    with _default_lock:
+        _default = index
+
+
+def default_index() -> LookalikeIndex:
+    """The process-wide index, built from the Tranco CSV on first use."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = LookalikeIndex(read_tranco())
+    return _default
+
+
+def lookalike_key(url_or_host: str):
+    """
+    (registered domain, subdomain) a URL is looked up by, via the public
+    suffix list ('paypal.co.uk', not 'co.uk'). The feature pipeline and the
+    API both go through here, so the model is served the feature it was
+    trained on.
+    """
+    te = tldextract.extract(url_or_host)
+    return te.registered_domain or te.domain or "", te.subdomain
+
+
+def lookalike_features(url: str) -> dict:
+    registered_domain, subdomain = lookalike_key(url)
+    match = default_index().lookup(registered_domain, subdomain)
+    is_lookalike = match is not None and match.kind != KIND_EXACT
+    return {
+        "is_lookalike": int(is_lookalike),
+        "lookalike_distance": match.distance if is_lookalike else -1,
+        "has_punycode": int("xn--" in (subdomain + "." + registered_domain).lower()),
+    }
@@ -0,0 +1,160 @@
+# profiling.py
+"""
+On-demand profiling for the API.
+
+RequestProfiler: cProfile of a single request, triggered by an admin header
+or a sampled fraction of requests. The N slowest profiles are kept.
+
+SamplingProfiler: time-boxed whole-process stack sampler (a background
+thread reading sys._current_frames()), reported as collapsed stacks that
+flamegraph tools accept directly.
+
+Both cost nothing beyond a couple of attribute checks when not in use.
+"""
+import cProfile
+import heapq
+import io
+import itertools
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))  # 0.01 = 1% of requests
+PROFILE_KEEP = 20           # slowest request profiles kept
+PROFILE_TOP_FUNCTIONS = 30  # functions listed per profile
+MAX_SAMPLING_SECONDS = 120
+DEFAULT_SAMPLING_INTERVAL = 0.005
+
+
+class RequestProfiler:
+    def __init__(self, keep: int = PROFILE_KEEP, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.keep = keep
+        self.sample_rate = sample_rate
+        self._heap = []  # min-heap of (elapsed, seq, entry): the root is the fastest kept
+        self._seq = itertools.count()
+        self._heap_lock = threading.Lock()
+        # One request profiled at a time; others just run unprofiled.
+        self._active = threading.Lock()
+
+    def should_profile(self, requested: bool = False) -> bool:
+        if requested:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def run(self, label: str, fn, *args, **kwargs):
+        if not self._active.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        try:
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._record(label, time.perf_counter() - start, profile)
+        finally:
+            self._active.release()
+
+    def _record(self, label: str, elapsed: float, profile: cProfile.Profile):
+        with self._heap_lock:
+            if len(self._heap) >= self.keep and elapsed <= self._heap[0][0]:
+                return  # not among the slowest; skip formatting entirely
+
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        entry = {
+            "label": label,
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "captured_at": time.time(),
+            "profile": out.getvalue(),
+        }
+
+        with self._heap_lock:
+            item = (elapsed, next(self._seq), entry)
+            if len(self._heap) < self.keep:
+                heapq.heappush(self._heap, item)
+            else:
+                heapq.heappushpop(self._heap, item)
+
+    def dump(self):
+        """Kept profiles, slowest first."""
+        with self._heap_lock:
+            return [entry for _, _, entry in sorted(self._heap, reverse=True)]
+
+    def clear(self):
+        with self._heap_lock:
+            self._heap = []
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_result = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float = DEFAULT_SAMPLING_INTERVAL) -> bool:
+        seconds = min(max(seconds, 0.1), MAX_SAMPLING_SECONDS)
+        interval = max(interval, 0.001)
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._sample, args=(seconds, interval), name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        return self.last_result
+
+    def _sample(self, seconds: float, interval: float):
+        own_id = threading.get_ident()
+        stacks = Counter()
+        leaf = Counter()
+        samples = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+
+        while not self._stop.is_set() and time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                if not names:
+                    continue
+                leaf[names[0].rsplit(":", 1)[0]] += 1
+                stacks[";".join(reversed(names))] += 1
+            samples += 1
+            self._stop.wait(interval)
+
+        self.last_result = {
+            "started_at": time.time() - (time.perf_counter() - start),
+            "duration_s": round(time.perf_counter() - start, 3),
+            "interval_ms": interval * 1000,
+            "samples": samples,
+            "top_functions": leaf.most_common(PROFILE_TOP_FUNCTIONS),
+            "collapsed_stacks": "\n".join(f"{s} {n}" for s, n in stacks.most_common()),
+        }
+
+    def status(self) -> dict:
+        return {"running": self.running, "has_result": self.last_result is not None}
@@ -0,0 +1,73 @@
+# readiness.py
+"""
+Readiness tracking for the API worker.
+
+Liveness only says the process is up. Readiness says every component a
+request depends on has been loaded and exercised: each component moves
+pending -> loading -> ready / degraded / failed, with its version and how
+long the load took. The worker is ready once nothing is pending, loading
+or failed.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+DEGRADED = "degraded"   # loaded, but with missing/partial data; still serves
+FAILED = "failed"
+
+
+class Readiness:
+    def __init__(self, components):
+        self._lock = threading.Lock()
+        self._components = {name: {"state": PENDING} for name in components}
+        self.started_at = time.time()
+        self.ready_at = None
+
+    @contextmanager
+    def loading(self, name: str):
+        """
+        Time a component load. The block fills the yielded dict with
+        version/details (and may set "state" to DEGRADED). An exception is
+        recorded as FAILED and not re-raised.
+        """
+        with self._lock:
+            self._components[name] = {"state": LOADING}
+        info = {}
+        start = time.perf_counter()
+        try:
+            yield info
+        except Exception as e:
+            state = FAILED
+            info["error"] = str(e) or type(e).__name__
+        else:
+            state = info.pop("state", READY)
+        entry = {
+            "state": state,
+            "load_seconds": round(time.perf_counter() - start, 3),
+            "loaded_at": time.time(),
+            **info,
+        }
+        with self._lock:
+            self._components[name] = entry
+            if self.ready_at is None and self._is_ready():
+                self.ready_at = time.time()
+
+    def _is_ready(self) -> bool:
+        return all(c["state"] in (READY, DEGRADED) for c in self._components.values())
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self._is_ready()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self._is_ready(),
+                "started_at": self.started_at,
+                "ready_at": self.ready_at,
+                "components": {name: dict(c) for name, c in self._components.items()},
+            }
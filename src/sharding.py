@@ -0,0 +1,183 @@
+# sharding.py
+"""
+Domain-affinity sharding across API nodes.
+
+Each registered domain is owned by one node, picked with a consistent-hash
+ring (VNODES points per node), so per-domain state -- WHOIS results,
+verdict cache entries, in-flight lookups -- lives on a single node instead
+of being rebuilt on every node behind a round-robin balancer. When a node
+joins or leaves, only the domains on its arcs of the ring move.
+
+A non-owner forwards the request to the owner once (marked with
+FORWARD_HEADER, so a node never re-forwards). A peer that fails is taken
+off the ring for PEER_RETRY_SECONDS and its domains are served by the
+next node on the ring meanwhile.
+"""
+import bisect
+import hashlib
+import threading
+import time
+
+VNODES = 128
+PEER_RETRY_SECONDS = 10
+FORWARD_TIMEOUT_SECONDS = 5
+FORWARD_HEADER = "X-Shard-Forwarded"
+
+
+def ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    def __init__(self, nodes=(), vnodes: int = VNODES):
+        self.vnodes = vnodes
+        self._points = []   # sorted hashes
+        self._owners = []   # node for each point
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.vnodes):
+            h = ring_hash(f"{node}#{i}")
+            idx = bisect.bisect_left(self._points, h)
+            self._points.insert(idx, h)
+            self._owners.insert(idx, node)
+
+    def remove(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        keep = [(h, n) for h, n in zip(self._points, self._owners) if n != node]
+        self._points = [h for h, _ in keep]
+        self._owners = [n for _, n in keep]
+
+    def node_for(self, key: str):
+        if not self._points:
+            return None
+        idx = bisect.bisect(self._points, ring_hash(key)) % len(self._points)
+        return self._owners[idx]
+
+
+class ShardRouter:
+    """
+    Ring membership for this node and its peers. Node ids are base URLs
+    (http://host:port); self_node is always on the ring.
+    """
+
+    def __init__(self, self_node: str, peers=(), vnodes: int = VNODES):
+        self.self_node = self_node
+        self._lock = threading.Lock()
+        self._ring = ConsistentHashRing([self_node, *peers], vnodes)
+        self._down = {}  # node -> retry at (monotonic)
+        self.forwarded = 0
+        self.received = 0
+        self.forward_failures = 0
+
+    def owner(self, key: str) -> str:
+        with self._lock:
+            if self._down:
+                self._revive()
+            return self._ring.node_for(key) or self.self_node
+
+    def is_local(self, key: str) -> bool:
+        return self.owner(key) == self.self_node
+
+    def _revive(self):
+        now = time.monotonic()
+        for node, retry_at in list(self._down.items()):
+            if retry_at <= now:
+                del self._down[node]
+                self._ring.add(node)
+
+    def join(self, node: str):
+        with self._lock:
+            self._down.pop(node, None)
+            self._ring.add(node)
+
+    def leave(self, node: str):
+        if node == self.self_node:
+            return
+        with self._lock:
+            self._down.pop(node, None)
+            self._ring.remove(node)
+
+    def mark_down(self, node: str):
+        """Forwarding to node failed: route around it for a while."""
+        with self._lock:
+            self.forward_failures += 1
+            if node in self._ring.nodes and node != self.self_node:
+                self._ring.remove(node)
+                self._down[node] = time.monotonic() + PEER_RETRY_SECONDS
+
+    def record_forwarded(self):
+        with self._lock:
+            self.forwarded += 1
+
+    def record_received(self):
+        with self._lock:
+            self.received += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "self": self.self_node,
+                "nodes": sorted(self._ring.nodes),
+                "down": sorted(self._down),
+                "forwarded": self.forwarded,
+                "received_forwarded": self.received,
+                "forward_failures": self.forward_failures,
+            }
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one: the first caller
+    runs fn, the others wait for and share its result (or exception).
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
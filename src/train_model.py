@@ -1,14 +1,27 @@
 import os
+import sys
+import time
+from contextlib import contextmanager
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import SVC
 from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.utils.class_weight import compute_class_weight
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix
 import joblib
 import json
+import argparse
+from datetime import datetime, timezone
+from feature_extraction import extract_url_features
+from ingest import read_manifest, iter_feed, latest_labels, normalize_url, url_hash
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 try:
     from xgboost import XGBClassifier
@@ -21,6 +34,22 @@ FEATURE_PATH = "data/processed/url_feature.csv"
 MODEL_DIR = "models"
 os.makedirs(MODEL_DIR, exist_ok=True)
 
+# Incremental refresh settings
+NEW_TREES = 50                 # trees added to a RandomForest per refresh
+NEW_BOOST_ROUNDS = 50          # boosting rounds added to XGBoost per refresh
+REPLAY_SIZE = 20_000           # reservoir sample of older rows mixed in
+HOLDOUT_FRACTION = 0.2
+PROMOTION_TOLERANCE = 0.005    # candidate may lose at most this much holdout F1
+
+# Large-data (--large) settings
+LARGE_CHUNK_SIZE = 250_000
+RAM_BUDGET_GB = 4.0
+DATA_RAM_FRACTION = 0.25       # share of the budget for the feature matrix; the rest is for fitting
+SUBSAMPLE_ROWS = 200_000       # stratified sample the expensive candidates train on
+QUADRATIC_MAX_ROWS = 20_000    # candidates costing O(n^2) or worse get a subsample this small
+QUADRATIC_COST = {'SVM'}
+RF_MAX_SAMPLES = 1_000_000     # bootstrap rows per tree on big data
+
 def load_data():
     df = pd.read_csv(FEATURE_PATH)
     print(f"Loaded {len(df)} samples")
@@ -159,7 +188,18 @@ def main():
         "uses_scaling": best_scaler is not None,
         "scaler_path": "scaler.joblib" if best_scaler else None,
         "encoder_path": "label_encoder.joblib",
-        "feature_columns": list(X.columns)
+        "feature_columns": list(X.columns),
+        "model_version": 1,
+        "lineage": [{
+            "version": 1,
+            "parent": None,
+            "mode": "full",
+            "model_path": f"{best_name.lower()}_model.joblib",
+            "trained_at": datetime.now(timezone.utc).isoformat(),
+            "train_rows": len(X_train),
+            "data_through_run": last_ingest_run(),
+            "test_f1": best_metrics["f1_score"],
+        }]
     }
     
     with open(os.path.join(MODEL_DIR, "model_info.json"), 'w') as f:
@@ -176,6 +216,541 @@ def main():
     
     print(f"\nModel saved to {MODEL_DIR}/")
 
+# ----------------------------
+# Incremental refresh
+# ----------------------------
+
+def last_ingest_run():
+    manifest = read_manifest()
+    return manifest[-1]["run_id"] if manifest else None
+
+
+def load_model_info():
+    with open(os.path.join(MODEL_DIR, "model_info.json")) as f:
+        return json.load(f)
+
+
+def promoted_at(model_info):
+    """When the current model was trained (UTC): its lineage entry, else its file's mtime"""
+    lineage = model_info.get("lineage") or []
+    if lineage and lineage[-1].get("trained_at"):
+        return datetime.fromisoformat(lineage[-1]["trained_at"])
+    path = os.path.join(MODEL_DIR, model_info["model_path"])
+    return datetime.fromtimestamp(os.path.getmtime(path), timezone.utc) if os.path.exists(path) else None
+
+
+def recent_sources(model_info):
+    """
+    Shard files ingested after the run the current model was trained through,
+    relabel shards included (a relabel is new information about an old URL).
+    Models without a data_through_run marker (trained before anything was
+    ingested, or before lineage existed) count as trained through every run
+    that started before they were, which covers the run seeding the index
+    from the CSV they were trained on.
+    """
+    lineage = model_info.get("lineage") or []
+    through = lineage[-1].get("data_through_run") if lineage else None
+    cutoff = promoted_at(model_info) if through is None else None
+    paths = []
+    seen_through = False
+    for record in read_manifest():
+        if through is None:
+            started = record.get("started_at")
+            seen_through = cutoff is None or (started is not None and datetime.fromisoformat(started) > cutoff)
+        if seen_through:
+            shards = (record.get("shards") or []) + (record.get("relabel_shards") or [])
+            paths.extend(s["path"] for s in shards)
+        elif record["run_id"] == through:
+            seen_through = True
+    return paths
+
+
+def encode_features(df, feature_cols, encoder):
+    """Raw feature rows (as written by feature_build.py) -> model input"""
+    X = df.reindex(columns=[c for c in feature_cols if c != 'scheme_encoded']).copy()
+    if 'scheme_encoded' in feature_cols:
+        codes = {c: i for i, c in enumerate(encoder.classes_)} if encoder is not None else {}
+        schemes = df['scheme'].fillna('') if 'scheme' in df.columns else pd.Series('', index=df.index)
+        X['scheme_encoded'] = schemes.map(codes).fillna(0).astype(int)
+    return X[feature_cols].fillna(0)
+
+
+def relabel_key(url):
+    """url_hash of a URL as the ingest index stores it"""
+    return url_hash(normalize_url(url) or url)
+
+
+def apply_relabels(df, relabels):
+    """Replace labels of rows whose URL was relabeled since it was ingested"""
+    if not relabels or df.empty or 'url' not in df.columns:
+        return df
+    latest = pd.to_numeric(df['url'].map(lambda u: relabels.get(relabel_key(u))))
+    return df.assign(label=latest.fillna(df['label']))
+
+
+def load_recent(paths, feature_cols, encoder, relabels=None):
+    """
+    Feature rows for the URLs in paths, one per URL (the last file wins),
+    labelled with the latest relabel where there is one.
+    """
+    latest = {}
+    for path in paths:
+        for url, label in iter_feed(path):
+            latest[relabel_key(url)] = (url, label)
+    rows = []
+    for key, (url, label) in latest.items():
+        label = (relabels or {}).get(key, label)
+        if label is None:
+            continue
+        feats = extract_url_features(url)
+        feats['label'] = int(label)
+        rows.append(feats)
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return None, None
+    return encode_features(df, feature_cols, encoder), df['label'].astype(int)
+
+
+def reservoir_sample(path, k, seed=42, chunksize=100_000):
+    """
+    Uniform sample of k rows from a CSV in one streaming pass:
+    keep the k rows with the smallest random keys seen so far.
+    """
+    rng = np.random.default_rng(seed)
+    kept = None
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = chunk.dropna(subset=['label'])
+        chunk = chunk.assign(_key=rng.random(len(chunk)))
+        kept = chunk if kept is None else pd.concat([kept, chunk])
+        kept = kept.nsmallest(k, '_key')
+    if kept is None:
+        return pd.DataFrame()
+    return kept.drop(columns=['_key'])
+
+
+def extend_model(model, X_train, y_train):
+    """
+    Grow a copy of the current model on the new window instead of refitting.
+    Returns the candidate and a short description of what was done.
+    """
+    if isinstance(model, RandomForestClassifier):
+        if model.class_weight in ('balanced', 'balanced_subsample'):
+            # 'balanced' would be recomputed from the small window only
+            classes = np.unique(y_train)
+            weights = compute_class_weight('balanced', classes=classes, y=y_train)
+            model.set_params(class_weight=dict(zip(classes, weights)))
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + NEW_TREES)
+        model.fit(X_train, y_train)
+        return model, f"warm_start +{NEW_TREES} trees (total {model.n_estimators})"
+    if HAS_XGBOOST and isinstance(model, XGBClassifier):
+        booster = model.get_booster()
+        model.set_params(n_estimators=NEW_BOOST_ROUNDS)
+        model.fit(X_train, y_train, xgb_model=booster)
+        return model, f"continued boosting +{NEW_BOOST_ROUNDS} rounds"
+    if isinstance(model, LogisticRegression):
+        model.set_params(warm_start=True)
+        model.fit(X_train, y_train)
+        return model, "warm_start from previous coefficients"
+    # SVC has no incremental mode: refit on the recent + replay window
+    model.fit(X_train, y_train)
+    return model, "refit on recent + replay window"
+
+
+def holdout_metrics(model, X, y):
+    y_pred = model.predict(X)
+    y_proba = model.predict_proba(X)[:, 1] if hasattr(model, 'predict_proba') else y_pred
+    return {
+        'f1_score': f1_score(y, y_pred, zero_division=0),
+        'accuracy': accuracy_score(y, y_pred),
+        'roc_auc': roc_auc_score(y, y_proba) if len(np.unique(y)) > 1 else 0.0,
+    }
+
+
+def incremental(recent_paths=None):
+    """
+    Refresh the current model with recently ingested data plus a replay
+    sample of older rows, and promote it only if it holds up on a holdout.
+    """
+    info = load_model_info()
+    feature_cols = info["feature_columns"]
+    encoder_path = os.path.join(MODEL_DIR, info.get("encoder_path") or "label_encoder.joblib")
+    encoder = joblib.load(encoder_path) if os.path.exists(encoder_path) else None
+    scaler = None
+    if info.get("uses_scaling"):
+        scaler = joblib.load(os.path.join(MODEL_DIR, info["scaler_path"]))
+
+    if recent_paths is None:
+        recent_paths = recent_sources(info)
+    relabels = latest_labels()
+    X_new, y_new = load_recent(recent_paths, feature_cols, encoder, relabels)
+    if X_new is None:
+        print("No new labelled data since the last refresh; nothing to do.")
+        return None
+    print(f"Recent rows: {len(X_new)} from {len(recent_paths)} file(s)")
+
+    if len(X_new) < 2:
+        print("Too few new rows to hold any out; nothing to do.")
+        return None
+
+    # The holdout comes from the new rows only: replay rows are drawn from
+    # the file the current model was trained on, so they would favour it.
+    stratify = y_new if y_new.value_counts().min() >= 2 else None
+    X_train, X_hold, y_train, y_hold = train_test_split(
+        X_new, y_new, test_size=HOLDOUT_FRACTION, random_state=42, stratify=stratify
+    )
+
+    replay = reservoir_sample(FEATURE_PATH, REPLAY_SIZE) if os.path.exists(FEATURE_PATH) else pd.DataFrame()
+    replay = apply_relabels(replay, relabels)
+    if len(replay):
+        X_train = pd.concat([X_train, encode_features(replay, feature_cols, encoder)], ignore_index=True)
+        y_train = pd.concat([y_train, replay['label'].astype(int)], ignore_index=True)
+    print(f"Replay rows: {len(replay)} (training only), holdout rows: {len(X_hold)}")
+
+    if scaler is not None:
+        X_train, X_hold = scaler.transform(X_train), scaler.transform(X_hold)
+
+    model_path = os.path.join(MODEL_DIR, info["model_path"])
+    current = joblib.load(model_path)
+    current_metrics = holdout_metrics(current, X_hold, y_hold)
+
+    candidate, how = extend_model(joblib.load(model_path), X_train, y_train)
+    candidate_metrics = holdout_metrics(candidate, X_hold, y_hold)
+    print(f"Current   holdout F1: {current_metrics['f1_score']:.4f}")
+    print(f"Candidate holdout F1: {candidate_metrics['f1_score']:.4f} ({how})")
+
+    if candidate_metrics['f1_score'] < current_metrics['f1_score'] - PROMOTION_TOLERANCE:
+        print("Candidate is worse on the holdout; keeping the current model.")
+        return None
+
+    version = info.get("model_version", 1) + 1
+    new_path = f"{info['model_name'].lower()}_model_v{version}.joblib"
+    joblib.dump(candidate, os.path.join(MODEL_DIR, new_path))
+
+    lineage = info.get("lineage") or [{"version": info.get("model_version", 1), "mode": "full",
+                                       "model_path": info["model_path"]}]
+    lineage.append({
+        "version": version,
+        "parent": info.get("model_version", 1),
+        "mode": "incremental",
+        "method": how,
+        "model_path": new_path,
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "recent_rows": len(X_new),
+        "replay_rows": len(replay),
+        "recent_sources": recent_paths,
+        "data_through_run": last_ingest_run(),
+        "holdout_f1": candidate_metrics['f1_score'],
+        "parent_holdout_f1": current_metrics['f1_score'],
+    })
+    info.update({"model_path": new_path, "model_version": version, "lineage": lineage})
+    with open(os.path.join(MODEL_DIR, "model_info.json"), 'w') as f:
+        json.dump(info, f, indent=2)
+
+    print(f"Promoted model v{version} -> {MODEL_DIR}/{new_path}")
+    return info
+
+
+# ----------------------------
+# Large-data training
+# ----------------------------
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes on macOS, KiB on Linux
+
+
+class StageLog:
+    """Wall time and memory per stage. Peak RSS is the process high-water mark so far."""
+
+    def __init__(self, budget_mb):
+        self.budget_mb = budget_mb
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        rss, peak = current_rss_mb(), peak_rss_mb()
+        record = {
+            "stage": name,
+            "seconds": round(time.perf_counter() - start, 2),
+            "rss_mb": round(rss, 1) if rss is not None else None,
+            "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        }
+        self.stages.append(record)
+        print(f"  [{name}] {record['seconds']}s, rss {record['rss_mb']} MB, peak {record['peak_rss_mb']} MB")
+        if peak is not None and peak > self.budget_mb:
+            print(f"  ⚠️ peak RSS above the {self.budget_mb:.0f} MB budget")
+
+
+def count_rows(path):
+    """Data rows (lines minus the header; an unterminated last line counts)."""
+    n = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 24), b""):
+            n += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        n += 1
+    return max(n - 1, 0)
+
+
+def load_large(path, budget_bytes, holdout_fraction=HOLDOUT_FRACTION, chunksize=LARGE_CHUNK_SIZE, seed=42):
+    """
+    Stream the feature CSV into one preallocated float32 matrix. Training
+    rows fill it from the front and holdout rows (a per-row random draw,
+    stratified in expectation) from the back, so both splits are views.
+    If the matrix wouldn't fit its share of the RAM budget, rows are
+    uniformly subsampled while reading; the capacity has slack for the
+    sample's variance, and should it still run out, the chunk that hits
+    the limit contributes a random subset of the rows that fit.
+    """
+    header = list(pd.read_csv(path, nrows=0).columns)
+    feature_cols = [c for c in header if c not in ['url', 'label', 'scheme']]
+    has_scheme = 'scheme' in header
+    cols = feature_cols + (['scheme_encoded'] if has_scheme else [])
+    n_rows = count_rows(path)
+
+    max_rows = int(budget_bytes * DATA_RAM_FRACTION / (4 * len(cols) + 1))
+    keep_p = min(1.0, max_rows / max(n_rows, 1))
+    capacity = n_rows if keep_p == 1.0 else int(max_rows * 1.01) + 1000
+    dropped = 0
+
+    X = np.empty((capacity, len(cols)), dtype=np.float32)
+    y = np.empty(capacity, dtype=np.int8)
+    front, back = 0, capacity
+    rng = np.random.default_rng(seed)
+    scheme_codes = {}
+
+    usecols = feature_cols + ['label'] + (['scheme'] if has_scheme else [])
+    dtypes = {c: np.float32 for c in feature_cols + ['label']}
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+        chunk = chunk[chunk['label'].notna()]
+        if keep_p < 1.0:
+            chunk = chunk[rng.random(len(chunk)) < keep_p]
+        block = np.empty((len(chunk), len(cols)), dtype=np.float32)
+        block[:, :len(feature_cols)] = np.nan_to_num(chunk[feature_cols].to_numpy(np.float32), copy=False)
+        if has_scheme:
+            local, uniques = pd.factorize(chunk['scheme'].fillna(''))
+            if len(uniques):
+                codes = np.array([scheme_codes.setdefault(u, len(scheme_codes)) for u in uniques])
+                block[:, -1] = codes[local]
+        labels = chunk['label'].to_numpy().astype(np.int8)
+
+        room = back - front
+        if len(block) > room:
+            # capacity reached (keep_p overshoot): keep a random subset
+            dropped += len(block) - room
+            pick = np.sort(rng.choice(len(block), size=room, replace=False))
+            block, labels = block[pick], labels[pick]
+        hold = rng.random(len(block)) < holdout_fraction
+        n_train, n_hold = int((~hold).sum()), int(hold.sum())
+        X[front:front + n_train], y[front:front + n_train] = block[~hold], labels[~hold]
+        X[back - n_hold:back], y[back - n_hold:back] = block[hold], labels[hold]
+        front += n_train
+        back -= n_hold
+
+    le = LabelEncoder()
+    if has_scheme:
+        # codes were assigned in order of appearance; LabelEncoder uses sorted order
+        le.classes_ = np.array(sorted(scheme_codes))
+        remap = np.empty(max(len(scheme_codes), 1), dtype=np.float32)
+        for name, code in scheme_codes.items():
+            remap[code] = int(np.searchsorted(le.classes_, name))
+        for part in (X[:front, -1], X[back:, -1]):
+            part[:] = remap[part.astype(np.int64)]
+
+    stats = {"rows_in_file": n_rows, "rows_kept": front + capacity - back,
+             "keep_fraction": round(keep_p, 4), "matrix_mb": round(X.nbytes / 2**20, 1)}
+    if dropped:
+        stats["rows_dropped_at_capacity"] = dropped
+        print(f"  ⚠️ matrix full: {dropped} sampled rows dropped")
+    return X[:front], y[:front], X[back:], y[back:], cols, le, stats
+
+
+def stratified_subsample(y, n, seed=42):
+    """Indices of about n rows with the class mix of y."""
+    if len(y) <= n:
+        return np.arange(len(y))
+    rng = np.random.default_rng(seed)
+    idx = []
+    for cls in np.unique(y):
+        members = np.flatnonzero(y == cls)
+        k = min(len(members), max(1, round(n * len(members) / len(y))))
+        idx.append(rng.choice(members, size=k, replace=False))
+    return np.sort(np.concatenate(idx))
+
+
+def large_scale(path=FEATURE_PATH, ram_budget_gb=RAM_BUDGET_GB):
+    """
+    Training for feature stores too big for main(): chunked float32 load,
+    one holdout instead of 5-fold CV, histogram boosting and forests on
+    all rows, linear/kernel candidates on a stratified subsample, and
+    quadratic-cost candidates (SVM) on a smaller one.
+    """
+    budget_mb = ram_budget_gb * 1024
+    log = StageLog(budget_mb)
+
+    with log.stage("load"):
+        X_train, y_train, X_hold, y_hold, feature_cols, le, data_stats = load_large(path, budget_mb * 2**20)
+    print(f"Train: {len(y_train)}, Holdout: {len(y_hold)} ({data_stats})")
+
+    with log.stage("subsample"):
+        sub = stratified_subsample(y_train, SUBSAMPLE_ROWS)
+        X_sub, y_sub = X_train[sub], y_train[sub]
+
+    n_pos = int((y_train == 1).sum())
+    n_neg = len(y_train) - n_pos
+    # name -> (model, trained on full data?, scaled?)
+    candidates = {
+        'HistGradientBoosting': (HistGradientBoostingClassifier(
+            max_iter=200,
+            learning_rate=0.1,
+            class_weight='balanced',
+            random_state=42
+        ), True, False),
+        'RandomForest': (RandomForestClassifier(
+            n_estimators=200,
+            max_depth=20,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            max_features='sqrt',
+            max_samples=RF_MAX_SAMPLES if len(y_train) > RF_MAX_SAMPLES else None,
+            random_state=42,
+            n_jobs=-1,
+            class_weight='balanced'
+        ), True, False),
+        'LogisticRegression': (LogisticRegression(
+            random_state=42,
+            max_iter=2000,
+            class_weight='balanced',
+            C=1.0
+        ), False, True),
+        'SVM': (SVC(
+            probability=True,
+            random_state=42,
+            class_weight='balanced',
+            C=1.0,
+            kernel='rbf'
+        ), False, True),
+    }
+    if HAS_XGBOOST:
+        candidates['XGBoost'] = (XGBClassifier(
+            random_state=42,
+            eval_metric='logloss',
+            tree_method='hist',
+            n_estimators=200,
+            max_depth=10,
+            learning_rate=0.1,
+            scale_pos_weight=n_neg / n_pos if n_pos > 0 else 1
+        ), True, False)
+
+    all_results = {}
+    best = None
+    for name, (model, full, scaled) in candidates.items():
+        X_fit, y_fit = (X_train, y_train) if full else (X_sub, y_sub)
+        if name in QUADRATIC_COST and len(y_fit) > QUADRATIC_MAX_ROWS:
+            print(f"\n{name}: cost grows quadratically, subsampling {len(y_fit)} -> {QUADRATIC_MAX_ROWS} rows")
+            small = stratified_subsample(y_fit, QUADRATIC_MAX_ROWS)
+            X_fit, y_fit = X_fit[small], y_fit[small]
+
+        print(f"\nTraining {name} on {len(y_fit)} rows...")
+        scaler = StandardScaler() if scaled else None
+        with log.stage(f"fit {name}"):
+            X_fit = pd.DataFrame(X_fit, columns=feature_cols, copy=False)
+            if scaler:
+                X_fit = scaler.fit_transform(X_fit)
+            model.fit(X_fit, y_fit)
+        with log.stage(f"evaluate {name}"):
+            X_eval = pd.DataFrame(X_hold, columns=feature_cols, copy=False)
+            if scaler:
+                X_eval = scaler.transform(X_eval)
+            metrics = holdout_metrics(model, X_eval, y_hold)
+        metrics['train_rows'] = len(y_fit)
+        all_results[name] = metrics
+        print(f"{name} - Accuracy: {metrics['accuracy']:.4f}, F1: {metrics['f1_score']:.4f}, AUC: {metrics['roc_auc']:.4f}")
+
+        if best is None or metrics['f1_score'] > all_results[best[0]]['f1_score']:
+            best = (name, model, scaler)
+
+    best_name, best_model, best_scaler = best
+    print(f"\nBest model: {best_name}")
+
+    with log.stage("save"):
+        model_path = f"{best_name.lower()}_model.joblib"
+        joblib.dump(best_model, os.path.join(MODEL_DIR, model_path))
+        if best_scaler:
+            joblib.dump(best_scaler, os.path.join(MODEL_DIR, "scaler.joblib"))
+        joblib.dump(le, os.path.join(MODEL_DIR, "label_encoder.joblib"))
+
+    model_info = {
+        "model_name": best_name,
+        "model_path": model_path,
+        "uses_scaling": best_scaler is not None,
+        "scaler_path": "scaler.joblib" if best_scaler else None,
+        "encoder_path": "label_encoder.joblib",
+        "feature_columns": feature_cols,
+        "model_version": 1,
+        "lineage": [{
+            "version": 1,
+            "parent": None,
+            "mode": "large",
+            "model_path": model_path,
+            "trained_at": datetime.now(timezone.utc).isoformat(),
+            "train_rows": all_results[best_name]['train_rows'],
+            "data_through_run": last_ingest_run(),
+            "test_f1": all_results[best_name]['f1_score'],
+        }]
+    }
+    with open(os.path.join(MODEL_DIR, "model_info.json"), 'w') as f:
+        json.dump(model_info, f, indent=2)
+
+    metrics_output = {
+        "best_model": best_name,
+        "best_model_metrics": all_results[best_name],
+        "all_models": all_results,
+        "data": data_stats,
+        "ram_budget_gb": ram_budget_gb,
+        "stages": log.stages,
+    }
+    with open(os.path.join(MODEL_DIR, "metrics.json"), 'w') as f:
+        json.dump(metrics_output, f, indent=2)
+
+    print(f"\nModel saved to {MODEL_DIR}/")
+    print("Stages:")
+    for st in log.stages:
+        print(f"  {st['stage']:<32} {st['seconds']:>8.2f}s  peak {st['peak_rss_mb']} MB")
+    return model_info
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the phishing URL model.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="extend the current model with recently ingested data instead of retraining")
+    parser.add_argument("--recent", nargs="+", metavar="CSV",
+                        help="url,label files to use as recent data (default: shards ingested since last refresh)")
+    parser.add_argument("--large", action="store_true",
+                        help="out-of-core mode for large feature stores (chunked load, subsampled expensive models)")
+    parser.add_argument("--features", default=FEATURE_PATH, help="feature CSV for --large")
+    parser.add_argument("--ram-budget-gb", type=float, default=RAM_BUDGET_GB,
+                        help="memory budget for --large; the data is subsampled to fit")
+    args = parser.parse_args()
+
+    if args.incremental:
+        incremental(args.recent)
+    elif args.large:
+        large_scale(args.features, args.ram_budget_gb)
+    else:
+        main()
 
@@ -0,0 +1,79 @@
+# verdict_cache.py
+"""
+Server-side verdict cache, keyed the same way as the extension's cache:
+by exact URL, or by registered domain when predict_internal returned
+cache_scope == "domain". Entries expire after their cache_ttl; the cache
+is LRU-bounded. A hit carries the TTL it has left, so clients that cache
+it in turn don't restart the clock.
+
+Each entry remembers the admission tier it was computed at, and is only
+served at that tier or a cheaper one: a verdict scored without WHOIS
+never answers a full-tier request.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from src.admission import TIERS, TIER_FULL
+
+DEFAULT_MAX_ENTRIES = 50_000
+
+
+class VerdictCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, tier, verdict)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_key(self, key, now, tier):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, entry_tier, verdict = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return None
+        if TIERS.index(entry_tier) > TIERS.index(tier):
+            return None
+        self._entries.move_to_end(key)
+        return {**verdict, "cache_ttl": math.ceil(expires_at - now)}
+
+    def get(self, url: str, reg_domain: str, tier: str = TIER_FULL):
+        now = time.time()
+        with self._lock:
+            verdict = self._get_key("u:" + url, now, tier)
+            if verdict is None and reg_domain:
+                verdict = self._get_key("d:" + reg_domain, now, tier)
+            if verdict is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return verdict
+
+    def put(self, verdict: dict, tier: str = TIER_FULL):
+        ttl = verdict.get("cache_ttl") or 0
+        if ttl <= 0:
+            return
+        if verdict.get("cache_scope") == "domain" and verdict.get("domain"):
+            key = "d:" + verdict["domain"]
+        else:
+            key = "u:" + verdict["url"]
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, tier, verdict)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
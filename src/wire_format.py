@@ -0,0 +1,249 @@
+# wire_format.py
+"""
+Binary encodings of /check_url requests and verdicts for high-volume
+clients; JSON stays the default (the extension uses it).
+
+Negotiated per request from Content-Type (request body) and Accept
+(response; defaults to the request's format):
+
+    application/json              {"url": ...} / {"urls": [...]}
+    application/msgpack           the same objects as MessagePack
+                                  (optional dependency: pip install msgpack)
+    application/x-verdict-struct  fixed-layout little-endian records with
+                                  enum-coded fields, described below
+
+Struct request:   b"PVQ1" uint32 count, then per URL: uint16 len + UTF-8
+Struct response:  b"PVR1" uint32 count, then per item: uint16 status and
+  status == 200:  VERDICT (20 bytes) + uint8 len + registered domain
+  otherwise:      uint16 len + UTF-8 error detail
+Items come back in request order; the URL itself isn't echoed.
+
+The enum tables are append-only: a code never changes meaning.
+"""
+import json
+import struct
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+STRUCT = "application/x-verdict-struct"
+MEDIA_ALIASES = {
+    "application/json": JSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/x-verdict-struct": STRUCT,
+}
+
+DECISION_REASONS = [
+    "known_phishing_url",
+    "known_phishing_host",
+    "high_reputation_or_old_domain",
+    "ml_high_conf_on_non_high_rep_domain",
+    "young_low_rep_and_suspicious",
+    "suspicious_subdomain_on_trusted_host",
+    "below_threshold_or_not_suspicious_enough",
+    "lookalike_of_popular_domain",
+]
+CONFIDENCES = ["low", "medium", "high"]
+SERVICE_TIERS = ["full", "no_whois", "cache_only"]
+UNKNOWN_CODE = 255
+
+# flags, decision_reason, confidence, service_tier,
+# probability, tranco_rank (-1 = none), domain_age_days (-1 = none), cache_ttl
+VERDICT = struct.Struct("<BBBBfiiI")
+FLAG_PHISHING = 1
+FLAG_CACHED = 2
+FLAG_DOMAIN_SCOPE = 4
+
+REQUEST_MAGIC = b"PVQ1"
+RESPONSE_MAGIC = b"PVR1"
+_HEADER = struct.Struct("<4sI")
+_U16 = struct.Struct("<H")
+
+_REASON_CODES = {r: i for i, r in enumerate(DECISION_REASONS)}
+_CONFIDENCE_CODES = {c: i for i, c in enumerate(CONFIDENCES)}
+_TIER_CODES = {t: i for i, t in enumerate(SERVICE_TIERS)}
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def media_type(header):
+    """Our canonical media type for a Content-Type/Accept entry, or None."""
+    if not header:
+        return None
+    return MEDIA_ALIASES.get(header.split(";", 1)[0].strip().lower())
+
+
+def negotiate(content_type, accept):
+    """
+    (request format, response format). Unknown/absent Content-Type means
+    JSON; an Accept without any of our types means "same as the request".
+    """
+    fmt_in = media_type(content_type) or JSON
+    fmt_out = fmt_in
+    for entry in (accept or "").split(","):
+        fmt = media_type(entry)
+        if fmt is not None:
+            fmt_out = fmt
+            break
+    if MSGPACK in (fmt_in, fmt_out) and not HAS_MSGPACK:
+        raise UnsupportedFormat("MessagePack support is not installed on this server.")
+    return fmt_in, fmt_out
+
+
+# ----------------------------
+# Requests
+# ----------------------------
+
+def decode_urls(body: bytes, fmt: str, batch: bool):
+    """
+    URLs from a request body: one for /check_url, a list for the batch
+    endpoint. Raises ValueError on a malformed body.
+    """
+    if fmt == STRUCT:
+        urls = _unpack_struct_request(body)
+        if not batch and len(urls) != 1:
+            raise ValueError("Expected exactly one URL.")
+        return urls
+
+    if fmt == MSGPACK:
+        try:
+            obj = msgpack.unpackb(body, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid MessagePack: {e}")
+    else:
+        try:
+            obj = json.loads(body)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+
+    if batch:
+        urls = obj.get("urls") if isinstance(obj, dict) else obj
+        if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+            raise ValueError("Expected {\"urls\": [<string>, ...]}.")
+        return urls
+    if not isinstance(obj, dict) or not isinstance(obj.get("url"), str):
+        raise ValueError("Expected {\"url\": <string>}.")
+    return [obj["url"]]
+
+
+def pack_struct_request(urls) -> bytes:
+    parts = [_HEADER.pack(REQUEST_MAGIC, len(urls))]
+    for url in urls:
+        raw = url.encode("utf-8")
+        parts.append(_U16.pack(len(raw)))
+        parts.append(raw)
+    return b"".join(parts)
+
+
+def _unpack_struct_request(body: bytes):
+    try:
+        magic, count = _HEADER.unpack_from(body, 0)
+        if magic != REQUEST_MAGIC:
+            raise ValueError("Bad magic.")
+        offset = _HEADER.size
+        urls = []
+        for _ in range(count):
+            (n,) = _U16.unpack_from(body, offset)
+            offset += _U16.size
+            if offset + n > len(body):
+                raise ValueError("Truncated body.")
+            urls.append(body[offset:offset + n].decode("utf-8"))
+            offset += n
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid struct request: {e}")
+    return urls
+
+
+# ----------------------------
+# Responses
+# ----------------------------
+
+def encode(items, fmt: str, batch: bool) -> bytes:
+    """
+    Encode verdict dicts (or error dicts with "status"/"error"). JSON and
+    MessagePack keep the dict shape: a single verdict, or {"results": [...]}
+    for a batch.
+    """
+    if fmt == STRUCT:
+        return _pack_struct_response(items)
+    payload = {"results": items} if batch else items[0]
+    if fmt == MSGPACK:
+        return msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def _pack_struct_response(items) -> bytes:
+    parts = [_HEADER.pack(RESPONSE_MAGIC, len(items))]
+    for v in items:
+        status = v.get("status", 200)
+        parts.append(_U16.pack(status))
+        if status != 200:
+            detail = str(v.get("error", "")).encode("utf-8")[:65535]
+            parts.append(_U16.pack(len(detail)))
+            parts.append(detail)
+            continue
+        flags = (FLAG_PHISHING if v.get("is_phishing") else 0) \
+            | (FLAG_CACHED if v.get("cached") else 0) \
+            | (FLAG_DOMAIN_SCOPE if v.get("cache_scope") == "domain" else 0)
+        rank = v.get("tranco_rank")
+        age = v.get("domain_age_days")
+        parts.append(VERDICT.pack(
+            flags,
+            _REASON_CODES.get(v.get("decision_reason"), UNKNOWN_CODE),
+            _CONFIDENCE_CODES.get(v.get("confidence"), UNKNOWN_CODE),
+            _TIER_CODES.get(v.get("service_tier"), UNKNOWN_CODE),
+            v.get("probability") or 0.0,
+            -1 if rank is None else rank,
+            -1 if age is None else age,
+            v.get("cache_ttl") or 0,
+        ))
+        domain = (v.get("domain") or "").encode("utf-8")[:255]
+        parts.append(bytes([len(domain)]))
+        parts.append(domain)
+    return b"".join(parts)
+
+
+def unpack_struct_response(data: bytes):
+    """Client side: struct response -> list of dicts shaped like the JSON verdicts."""
+    magic, count = _HEADER.unpack_from(data, 0)
+    if magic != RESPONSE_MAGIC:
+        raise ValueError("Bad magic.")
+    offset = _HEADER.size
+    items = []
+    for _ in range(count):
+        (status,) = _U16.unpack_from(data, offset)
+        offset += _U16.size
+        if status != 200:
+            (n,) = _U16.unpack_from(data, offset)
+            offset += _U16.size
+            items.append({"status": status, "error": data[offset:offset + n].decode("utf-8")})
+            offset += n
+            continue
+        flags, reason, confidence, tier, prob, rank, age, ttl = VERDICT.unpack_from(data, offset)
+        offset += VERDICT.size
+        n = data[offset]
+        domain = data[offset + 1:offset + 1 + n].decode("utf-8")
+        offset += 1 + n
+        items.append({
+            "is_phishing": bool(flags & FLAG_PHISHING),
+            "probability": prob,
+            "confidence": CONFIDENCES[confidence] if confidence < len(CONFIDENCES) else None,
+            "domain": domain,
+            "tranco_rank": None if rank < 0 else rank,
+            "domain_age_days": None if age < 0 else age,
+            "decision_reason": DECISION_REASONS[reason] if reason < len(DECISION_REASONS) else None,
+            "cache_ttl": ttl,
+            "cache_scope": "domain" if flags & FLAG_DOMAIN_SCOPE else "url",
+            "service_tier": SERVICE_TIERS[tier] if tier < len(SERVICE_TIERS) else None,
+            "cached": bool(flags & FLAG_CACHED),
+        })
+    return items